@@ -7,6 +7,7 @@ from datetime import datetime, timedelta
 import time
 import json
 import threading
+import uuid
 from queue import Queue
 
 from twitter_client import TwitterClient
@@ -14,6 +15,7 @@ from sentiment_analyzer import EnhancedSentimentAnalyzer
 from multilingual_analyzer import MultilingualSentimentAnalyzer
 from geographic_analyzer import GeographicSentimentAnalyzer
 from gemini_analyzer import GeminiSentimentAnalyzer
+from sentiment_aggregator import IncrementalSentimentAggregator
 
 # Configure page
 st.set_page_config(
@@ -27,7 +29,7 @@ st.set_page_config(
 def get_clients():
     try:
         gemini_analyzer = GeminiSentimentAnalyzer()
-        enhanced_analyzer = EnhancedSentimentAnalyzer(gemini_analyzer)
+        enhanced_analyzer = EnhancedSentimentAnalyzer(gemini_analyzer, compact_output=True, arrow_text=True)
         multilingual_analyzer = MultilingualSentimentAnalyzer()
         geo_analyzer = GeographicSentimentAnalyzer()
         twitter_client = TwitterClient()
@@ -69,12 +71,20 @@ except Exception as e:
 # Real-time data queue
 if 'tweet_queue' not in st.session_state:
     st.session_state.tweet_queue = Queue()
-if 'real_time_posts' not in st.session_state:
-    st.session_state.real_time_posts = []
 if 'streaming_active' not in st.session_state:
     st.session_state.streaming_active = False
 if 'stream_start_time' not in st.session_state:
     st.session_state.stream_start_time = None
+if 'stream_session_id' not in st.session_state:
+    # The Twitter client is shared across sessions; this keeps each session's stream apart
+    st.session_state.stream_session_id = uuid.uuid4().hex
+
+# Real-time posts are scored once on arrival; the dashboard reads running aggregates
+REALTIME_ANALYSIS_WINDOW = 100
+# Seconds between reruns that drain the stream buffer while streaming
+REALTIME_REFRESH_SECONDS = 2
+if 'realtime_aggregator' not in st.session_state:
+    st.session_state.realtime_aggregator = IncrementalSentimentAggregator(analyzer, window_size=REALTIME_ANALYSIS_WINDOW)
 
 # Custom CSS for better styling
 st.markdown("""
@@ -159,6 +169,35 @@ enable_gemini = st.sidebar.checkbox("Enable Gemini AI Analysis", value=gemini_av
 enable_multilingual = st.sidebar.checkbox("Enable Multilingual Analysis", value=multilingual_available)
 enable_geographic = st.sidebar.checkbox("Enable Geographic Analysis", value=multilingual_available)
 
+# Scorer pipeline selection
+scoring_modes = {
+    "Combined (VADER + TextBlob)": "combined",
+    "Cascade (TextBlob only when ambiguous)": "cascade",
+    "VADER only": "vader",
+    "TextBlob only": "textblob"
+}
+scoring_mode_label = st.sidebar.selectbox("Scoring mode:", list(scoring_modes.keys()))
+# The analyzer is shared by every session, so the mode is passed per call rather than set on it
+scoring_mode = scoring_modes[scoring_mode_label]
+if hasattr(analyzer, 'latency_report'):
+    latency_report = analyzer.latency_report()
+    if latency_report:
+        with st.sidebar.expander("⏱️ Scoring latency"):
+            for mode, stats in latency_report.items():
+                line = f"**{mode}**: {stats['avg_ms_per_text']:.3f} ms/post over {stats['texts']} posts"
+                if 'textblob_rate' in stats:
+                    line += f" (TextBlob on {stats['textblob_rate'] * 100:.0f}%)"
+                st.write(line)
+
+if gemini_available and enable_gemini:
+    with st.sidebar.expander("🚦 Gemini rate limits"):
+        metrics = gemini_analyzer.rate_limit_metrics()
+        st.write(f"**Concurrency limit**: {metrics['concurrency_limit']} ({metrics['in_flight']} in flight)")
+        st.write(f"**Queue depth**: {metrics['queue_depth']}")
+        st.write(f"**Requests**: {metrics['requests']} ({metrics['throttled']} throttled, "
+                 f"{metrics['retries']} retries, {metrics['failures']} failed)")
+        st.write(f"**Circuit**: {metrics['circuit']['state']}")
+
 # Status indicators
 if not gemini_available:
     st.sidebar.warning("⚠️ Gemini AI unavailable - add GEMINI_API_KEY to .env")
@@ -171,7 +210,6 @@ if not streaming_available and analysis_mode == "Real-Time Streaming":
 if analysis_mode == "Real-Time Streaming":
     st.sidebar.title("🔴 Real-Time Controls")
     query = st.sidebar.text_input("Enter topic to monitor:", "AI technology")
-    max_tweets = st.sidebar.slider("Max tweets to keep:", 100, 2000, 500)
     
     col1, col2 = st.sidebar.columns(2)
     
@@ -180,15 +218,19 @@ if analysis_mode == "Real-Time Streaming":
             if twitter_client and streaming_available:
                 st.session_state.streaming_active = True
                 st.session_state.stream_start_time = datetime.now()
-                st.session_state.real_time_posts = []
+                st.session_state.realtime_aggregator = IncrementalSentimentAggregator(
+                    analyzer, window_size=REALTIME_ANALYSIS_WINDOW, scoring_mode=scoring_mode
+                )
                 
-                # Add callback for new tweets
+                # Add callback for new tweets; it replaces this session's earlier one
+                tweet_queue = st.session_state.tweet_queue
                 def on_new_tweet(tweet_data):
-                    st.session_state.tweet_queue.put(tweet_data)
+                    tweet_queue.put(tweet_data)
                 
                 # Start streaming using TwitterClient's method
-                twitter_client.add_stream_callback(on_new_tweet)
-                success = twitter_client.start_real_time_stream(query, on_new_tweet)
+                success = twitter_client.start_real_time_stream(
+                    query, on_new_tweet, session_id=st.session_state.stream_session_id
+                )
                 
                 if success:
                     st.success("🎯 Real-time streaming started!")
@@ -199,6 +241,7 @@ if analysis_mode == "Real-Time Streaming":
     
     with col2:
         if st.button("⏹️ Stop Streaming", use_container_width=True):
+            twitter_client.stop_stream(st.session_state.stream_session_id)
             st.session_state.streaming_active = False
             st.session_state.stream_start_time = None
             st.info("Streaming stopped")
@@ -213,18 +256,38 @@ if analysis_mode == "Real-Time Streaming":
         
         duration = datetime.now() - st.session_state.stream_start_time
         st.sidebar.write(f"⏱️ Duration: {duration.total_seconds():.0f}s")
-        st.sidebar.write(f"📊 Tweets collected: {len(st.session_state.real_time_posts)}")
+        st.sidebar.write(f"📊 Tweets collected: {len(st.session_state.realtime_aggregator)}")
+        stream_stats = twitter_client.stream_stats(st.session_state.stream_session_id)
+        if stream_stats:
+            st.sidebar.write(f"🔌 Stream: {stream_stats['state']} "
+                             f"({stream_stats['reconnects']} reconnects, {stream_stats['dropped']} dropped)")
 
 # HISTORICAL ANALYSIS MODE
 else:
     st.sidebar.title("📊 Historical Controls")
     query = st.sidebar.text_input("Enter topic to analyze:", "AI technology")
-    post_limit = st.sidebar.slider("Number of posts to analyze:", 10, 200, 50)
+    post_limit = st.sidebar.slider("Number of posts to analyze:", 10, 2000, 50, step=10)
     refresh_rate = st.sidebar.selectbox("Refresh rate (seconds):", [30, 60, 120, 300], index=1)
+    trend_bucket = st.sidebar.selectbox("Trend bucket:", ["1m", "5m", "15m", "1h", "1d"], index=3)
     auto_refresh = st.sidebar.checkbox("Auto-refresh", value=False)
 
+# Add this function in app.py
+async def check_real_time_updates():
+    """Check for real-time updates; new posts reach tweet_queue through the stream callback"""
+    if (st.session_state.streaming_active and 
+        streaming_client and 
+        hasattr(streaming_client, 'check_stream_updates')):
+        
+        try:
+            await streaming_client.check_stream_updates(st.session_state.stream_session_id)
+        except Exception as e:
+            st.error(f"Stream update error: {e}")
+
 # Process real-time tweets
 if st.session_state.streaming_active:
+    # Pull whatever the stream buffered since the last rerun
+    asyncio.run(check_real_time_updates())
+    
     # Process new tweets from queue
     new_tweets = []
     while not st.session_state.tweet_queue.empty():
@@ -236,67 +299,44 @@ if st.session_state.streaming_active:
     
     if new_tweets:
         # Convert to post format
+        new_posts = []
         for tweet in new_tweets:
             post = {
                 'text': tweet.get('text', ''),
                 'created_at': tweet.get('created_at', datetime.now().isoformat()),
                 'id': tweet.get('id', ''),
-                'likes': tweet.get('public_metrics', {}).get('like_count', 0),
-                'retweets': tweet.get('public_metrics', {}).get('retweet_count', 0),
-                'user': 'twitter_user',
-                'verified': False,
+                'likes': tweet.get('likes', tweet.get('public_metrics', {}).get('like_count', 0)),
+                'retweets': tweet.get('retweets', tweet.get('public_metrics', {}).get('retweet_count', 0)),
+                'user': tweet.get('user', 'twitter_user'),
+                'verified': tweet.get('verified', False),
                 'source': 'realtime_stream',
                 'real_time': True
             }
-            st.session_state.real_time_posts.append(post)
+            new_posts.append(post)
         
-        # Keep only recent tweets
-        if len(st.session_state.real_time_posts) > max_tweets:
-            st.session_state.real_time_posts = st.session_state.real_time_posts[-max_tweets:]
-
-# Add this function in app.py
-async def check_real_time_updates():
-    """Check for real-time updates"""
-    if (st.session_state.streaming_active and 
-        streaming_client and 
-        hasattr(streaming_client, 'check_stream_updates')):
-        
-        try:
-            new_posts = await streaming_client.check_stream_updates()
-            for post in new_posts:
-                st.session_state.tweet_queue.put(post)
-        except Exception as e:
-            st.error(f"Stream update error: {e}")
+        # Score only the new arrivals; the aggregator's window keeps the recent ones
+        st.session_state.realtime_aggregator.add_posts(new_posts)
 
 # Analysis function for real-time data
 async def analyze_real_time_data():
     """Analyze real-time streaming data"""
-    if not st.session_state.real_time_posts:
+    aggregator = st.session_state.realtime_aggregator
+    if not len(aggregator):
         return None
     
-    posts = st.session_state.real_time_posts[-100:]  # Analyze last 100 tweets
-    
-    with st.spinner("🔄 Analyzing real-time sentiment..."):
-        # Convert to DataFrame
-        df = pd.DataFrame(posts)
-        
-        # Enhanced sentiment analysis
-        if hasattr(analyzer, 'analyze_posts_enhanced'):
-            basic_summary, trends, detailed_df, gemini_analyses = await analyzer.analyze_posts_enhanced(df)
-        else:
-            basic_summary, trends, detailed_df = analyzer.analyze_posts(posts)
-            gemini_analyses = {}
-        
-        return {
-            'basic': basic_summary,
-            'trends': trends,
-            'detailed_df': detailed_df,
-            'gemini_analyses': gemini_analyses,
-            'raw_posts': posts
-        }
+    # Summary and trends come from the running aggregates, so there is no
+    # DataFrame rebuild or rescoring of the window here
+    return {
+        'basic': aggregator.summary(),
+        'trends': aggregator.trends(),
+        'detailed_df': aggregator.detailed_df(),
+        'gemini_analyses': {},
+        'raw_posts': aggregator.recent_posts()
+    }
 
 # Main analysis function for historical data
-async def perform_ai_analysis(query, limit, enable_gemini, enable_multilingual, enable_geographic):
+async def perform_ai_analysis(query, limit, enable_gemini, enable_multilingual, enable_geographic, scoring_mode,
+                              trend_bucket):
     """Fetch posts and perform AI-powered analysis"""
     with st.spinner("🔄 Fetching and analyzing posts with AI..."):
         # Fetch posts
@@ -311,10 +351,14 @@ async def perform_ai_analysis(query, limit, enable_gemini, enable_multilingual,
         
         # Enhanced sentiment analysis
         if hasattr(analyzer, 'analyze_posts_enhanced'):
-            basic_summary, trends, detailed_df, gemini_analyses = await analyzer.analyze_posts_enhanced(df)
+            basic_summary, trends, detailed_df, gemini_analyses = await analyzer.analyze_posts_enhanced(
+                df, scoring_mode=scoring_mode, trend_bucket=trend_bucket
+            )
         else:
             # Fallback to basic analysis
-            basic_summary, trends, detailed_df = analyzer.analyze_posts(posts)
+            basic_summary, trends, detailed_df = analyzer.analyze_posts(
+                posts, scoring_mode=scoring_mode, trend_bucket=trend_bucket
+            )
             gemini_analyses = {}
         
         # Multilingual analysis
@@ -353,7 +397,7 @@ if analysis_mode == "Real-Time Streaming" and st.session_state.streaming_active:
     st.subheader("📊 Real-Time Sentiment Dashboard")
     
     # Auto-refresh real-time analysis
-    if st.session_state.real_time_posts:
+    if len(st.session_state.realtime_aggregator):
         if 'last_realtime_analysis' not in st.session_state:
             st.session_state.last_realtime_analysis = datetime.now()
         
@@ -374,7 +418,7 @@ if analysis_mode == "Real-Time Streaming" and st.session_state.streaming_active:
         col1, col2, col3, col4, col5 = st.columns(5)
         
         with col1:
-            st.metric("Total Tweets", len(st.session_state.real_time_posts))
+            st.metric("Total Tweets", len(st.session_state.realtime_aggregator))
         
         with col2:
             st.metric("Positive", f"{basic_summary['sentiment_percentages']['positive']:.1f}%")
@@ -395,14 +439,14 @@ if analysis_mode == "Real-Time Streaming" and st.session_state.streaming_active:
         # Real-time chart
         st.subheader("📈 Real-Time Sentiment Trend")
         
-        if len(st.session_state.real_time_posts) > 10:
-            # Create time-series data
+        if len(st.session_state.realtime_aggregator) > 10:
+            # Create time-series data from the sentiments scored on arrival
             time_data = []
-            for i, post in enumerate(st.session_state.real_time_posts[-50:]):
-                sentiment, _ = analyzer.classify_sentiment(post['text'])
+            recent_posts = st.session_state.realtime_aggregator.recent_posts(50)
+            for i, post in enumerate(recent_posts):
                 time_data.append({
                     'time': i,
-                    'sentiment': sentiment,
+                    'sentiment': post['sentiment'],
                     'text': post['text'][:50] + '...'
                 })
             
@@ -431,8 +475,8 @@ if analysis_mode == "Real-Time Streaming" and st.session_state.streaming_active:
         # Live tweet feed
         st.subheader("🐦 Live Tweet Feed")
         
-        for post in st.session_state.real_time_posts[-10:][::-1]:  # Show latest first
-            sentiment, score = analyzer.classify_sentiment(post['text'])
+        for post in st.session_state.realtime_aggregator.recent_posts(10)[::-1]:  # Show latest first
+            sentiment, score = post['sentiment'], post['score']
             sentiment_color = {
                 'positive': 'positive',
                 'neutral': 'neutral', 
@@ -477,7 +521,8 @@ elif analysis_mode == "Historical Analysis":
     # Perform analysis if refresh was triggered
     if st.session_state.last_refresh:
         analysis_data = asyncio.run(
-            perform_ai_analysis(query, post_limit, enable_gemini, enable_multilingual, enable_geographic)
+            perform_ai_analysis(query, post_limit, enable_gemini, enable_multilingual, enable_geographic,
+                                scoring_mode, trend_bucket)
         )
         st.session_state.analysis_data = analysis_data
     else:
@@ -717,12 +762,12 @@ elif analysis_mode == "Historical Analysis":
             if trends is not None and not trends.empty and len(trends) > 1:
                 # Reset index and prepare data for plotting
                 trends_reset = trends.reset_index()
-                if 'hour' in trends_reset.columns:
+                if 'bucket' in trends_reset.columns:
                     fig_trend = px.line(
                         trends_reset, 
-                        x='hour', 
+                        x='bucket', 
                         y=['positive', 'neutral', 'negative'],
-                        labels={'value': 'Number of Posts', 'hour': 'Time'},
+                        labels={'value': 'Number of Posts', 'bucket': 'Time'},
                         color_discrete_map={
                             'positive': '#00cc96',
                             'neutral': '#636efa',
@@ -869,4 +914,9 @@ st.markdown("""
 <div style='text-align: center'>
     <p>Built with Streamlit • Real-Time Twitter Streaming • Advanced NLP • Multilingual Support • Geographic Analysis</p>
 </div>
-""", unsafe_allow_html=True)
\ No newline at end of file
+""", unsafe_allow_html=True)
+
+# Rerun shortly so newly buffered posts keep flowing into the dashboard
+if analysis_mode == "Real-Time Streaming" and st.session_state.streaming_active:
+    time.sleep(REALTIME_REFRESH_SECONDS)
+    st.rerun()
\ No newline at end of file
@@ -0,0 +1,114 @@
+import threading
+import time
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an endpoint whose circuit is open"""
+
+class CircuitBreaker:
+    """Closed/open/half-open breaker that fails fast while an endpoint is down
+
+    closed:    calls go through; failure_threshold consecutive failures open it
+    open:      calls are refused until recovery_timeout has passed
+    half-open: up to half_open_max_calls probes go through; a success closes
+               the circuit, a failure opens it for another recovery_timeout
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, name, failure_threshold=5, recovery_timeout=30.0, half_open_max_calls=1):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        self._lock = threading.Lock()
+
+        self.rejected = 0
+        self.times_opened = 0
+
+    @property
+    def state(self):
+        with self._lock:
+            self._refresh(time.monotonic())
+            return self._state
+
+    def allow_request(self):
+        """True if a call may go out now; refused calls should go straight to a fallback"""
+        with self._lock:
+            self._refresh(time.monotonic())
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.HALF_OPEN and self._probes < self.half_open_max_calls:
+                self._probes += 1
+                return True
+            self.rejected += 1
+            return False
+
+    def check(self):
+        """Raise CircuitOpenError if a call may not go out now"""
+        if not self.allow_request():
+            raise CircuitOpenError(f"Circuit '{self.name}' is open")
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            if self._state != self.CLOSED:
+                self._state = self.CLOSED
+                self._probes = 0
+
+    def record_failure(self):
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._open()
+                return
+            self._failures += 1
+            if self._state == self.CLOSED and self._failures >= self.failure_threshold:
+                self._open()
+
+    def record_abandoned(self):
+        """A call that was let through ended without a verdict (e.g. it was cancelled)"""
+        with self._lock:
+            if self._state == self.HALF_OPEN and self._probes > 0:
+                self._probes -= 1
+
+    def stats(self):
+        with self._lock:
+            now = time.monotonic()
+            self._refresh(now)
+            return {
+                'state': self._state,
+                'consecutive_failures': self._failures,
+                'times_opened': self.times_opened,
+                'rejected': self.rejected,
+                'retry_in_s': max(0.0, self._opened_at + self.recovery_timeout - now) if self._state == self.OPEN else 0.0
+            }
+
+    def _open(self):
+        self._state = self.OPEN
+        self._opened_at = time.monotonic()
+        self._probes = 0
+        self.times_opened += 1
+        print(f"⚠️ Circuit '{self.name}' opened; failing fast for {self.recovery_timeout:.0f}s")
+
+    def _refresh(self, now):
+        if self._state == self.OPEN and now - self._opened_at >= self.recovery_timeout:
+            self._state = self.HALF_OPEN
+            self._probes = 0
+
+_circuit_breakers = {}
+_circuit_breakers_lock = threading.Lock()
+
+def get_circuit_breaker(name, **config):
+    """Process-wide breaker for an endpoint; config only applies when it is first created"""
+    with _circuit_breakers_lock:
+        breaker = _circuit_breakers.get(name)
+        if breaker is None:
+            breaker = CircuitBreaker(name, **config)
+            _circuit_breakers[name] = breaker
+        return breaker
@@ -0,0 +1,96 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+DEFAULT_CONNECTIVITY_PATH = os.getenv('API_STATE_PATH', os.path.join('.cache', 'api_state.json'))
+
+class ConnectivityCache:
+    """Remembers whether an API was reachable, shared across processes through a small JSON file
+
+    Entries expire after ttl_seconds, after which the next real request decides
+    again. Writes go to a temp file that replaces the state file, so readers
+    never see a half-written file; concurrent writers are last-one-wins.
+    """
+
+    def __init__(self, path=DEFAULT_CONNECTIVITY_PATH, ttl_seconds=15 * 60):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._mtime = None
+
+    @staticmethod
+    def make_key(name, credential):
+        """Key per API and credential; the credential itself is never written"""
+        digest = hashlib.sha256((credential or '').encode('utf-8')).hexdigest()[:16]
+        return f'{name}:{digest}'
+
+    def get(self, key):
+        """True/False while a verdict is fresh, None when unknown or expired"""
+        with self._lock:
+            self._reload()
+            entry = self._entries.get(key)
+        if entry is None or time.time() - entry.get('checked_at', 0) > self.ttl_seconds:
+            return None
+        return bool(entry.get('available'))
+
+    def set(self, key, available, detail=None):
+        entry = {'available': bool(available), 'checked_at': time.time(), 'detail': detail}
+        with self._lock:
+            self._reload()
+            previous = self._entries.get(key)
+            if previous and previous.get('available') == entry['available'] and \
+                    entry['checked_at'] - previous.get('checked_at', 0) < self.ttl_seconds / 2:
+                # Same verdict written recently; skip the disk write
+                return
+            self._entries[key] = entry
+            self._write()
+
+    def _reload(self):
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return
+        if mtime == self._mtime:
+            return
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return
+        if isinstance(entries, dict):
+            self._entries = entries
+            self._mtime = mtime
+
+    def _write(self):
+        try:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.api_state.', suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(self._entries, f)
+                os.replace(temp_path, self.path)
+            except BaseException:
+                os.unlink(temp_path)
+                raise
+            self._mtime = os.stat(self.path).st_mtime_ns
+        except OSError as e:
+            # The in-process verdict still applies; other processes just decide for themselves
+            print(f"⚠️ Could not write API state file {self.path}: {e}")
+
+_connectivity_caches = {}
+_connectivity_caches_lock = threading.Lock()
+
+def get_connectivity_cache(path=DEFAULT_CONNECTIVITY_PATH, **config):
+    """Process-wide cache per state file; config only applies when it is first created"""
+    with _connectivity_caches_lock:
+        cache = _connectivity_caches.get(path)
+        if cache is None:
+            cache = ConnectivityCache(path, **config)
+            _connectivity_caches[path] = cache
+        return cache
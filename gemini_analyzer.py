@@ -1,35 +1,128 @@
-import google.generativeai as genai
 import os
 from dotenv import load_dotenv
 import logging
 import asyncio
 import aiohttp
 import json
+import numbers
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from textblob.en import sentiment as pattern_sentiment
+
+from circuit_breaker import CircuitOpenError, get_circuit_breaker
+from gemini_backends import GenAIBackend, backend_from_env
+from gemini_cache import GeminiCache, DEFAULT_GEMINI_CACHE_PATH
+from json_stream import IncrementalJSONObjectParser
+from rate_limiter import RateLimitTimeout, get_rate_limiter
+from single_flight import get_single_flight
 
 load_dotenv()
 
+GEMINI_SENTIMENTS = ('positive', 'neutral', 'negative')
+GEMINI_INTENSITIES = ('low', 'medium', 'high')
+
+# Fields of a detailed analysis; sentiment and confidence are surfaced as soon as they stream in
+ANALYSIS_FIELDS = ('sentiment', 'confidence', 'emotional_tone', 'key_topics', 'summary', 'reasoning', 'intensity')
+EARLY_FIELDS = ('sentiment', 'confidence')
+
 class GeminiSentimentAnalyzer:
-    def __init__(self):
+    # Rough per-post cost of the index/quote wrapping in a packed prompt
+    PACKED_ITEM_OVERHEAD_TOKENS = 12
+    # Rough size of one JSON analysis in the response, for tokens/min pacing
+    RESPONSE_TOKENS_PER_POST = 150
+    
+    # Exceptions that mean "slow down" or "try again" rather than a bad request
+    RETRYABLE_ERRORS = ('ResourceExhausted', 'TooManyRequests', 'ServiceUnavailable',
+                        'DeadlineExceeded', 'InternalServerError', 'TimeoutError')
+    
+    # Consecutive failures that open the circuit, and seconds before a probe is let through
+    CIRCUIT_FAILURE_THRESHOLD = 5
+    CIRCUIT_RECOVERY_SECONDS = 30.0
+    
+    def __init__(self, max_concurrency=5, request_timeout=30.0, executor_workers=None,
+                 pack_token_budget=3000, max_pack_size=25,
+                 cache_path=DEFAULT_GEMINI_CACHE_PATH, cache_ttl=24 * 60 * 60, cache_max_entries=20000,
+                 requests_per_minute=60, tokens_per_minute=120000, latency_budget=60.0,
+                 backend=None, stream=True):
         self.api_key = os.getenv('GEMINI_API_KEY')
-        self.is_available = bool(self.api_key)
         
-        if self.is_available:
+        # Any object with model_name and generate(prompt, timeout) can stand in for
+        # the real API; GEMINI_BACKEND selects a stand-in without code changes
+        self.backend = backend if backend is not None else backend_from_env()
+        if self.backend is None and self.api_key:
             try:
-                genai.configure(api_key=self.api_key)
-                self.model = genai.GenerativeModel('gemini-1.5-pro-latest')
+                self.backend = GenAIBackend(self.api_key)
                 print("✅ Gemini AI initialized successfully")
             except Exception as e:
                 print(f"❌ Gemini AI initialization failed: {e}")
-                self.is_available = False
-        else:
+        elif self.backend is None:
             print("⚠️ Gemini API key not found. Using fallback analysis.")
+        else:
+            print(f"✅ Gemini backend: {type(self.backend).__name__} ({self.backend.model_name})")
+        self.is_available = self.backend is not None
+        # Stream completions and parse fields as they arrive, when the backend supports it
+        self.stream = stream
+        
+        # Concurrent requests for the same text share one call, across sessions
+        self.in_flight = get_single_flight('gemini:detailed')
+        
+        # Batch concurrency: in-flight limit per batch, a dedicated I/O thread
+        # pool (so Gemini calls never starve the default executor) and a
+        # per-request timeout
+        self.max_concurrency = max_concurrency
+        self.request_timeout = request_timeout
+        self.executor = ThreadPoolExecutor(
+            max_workers=executor_workers or max_concurrency * 2,
+            thread_name_prefix='gemini'
+        )
+        
+        # Packed mode: several posts share one prompt, as many as fit the budget
+        self.pack_token_budget = pack_token_budget
+        self.max_pack_size = max_pack_size
+        
+        # Analyses are cached on disk per (text, model, prompt version); a falsy
+        # cache_path disables the cache
+        self.model_name = self.backend.model_name if self.backend is not None else 'gemini-1.5-pro-latest'
+        self.cache = GeminiCache(cache_path, cache_ttl, cache_max_entries) if cache_path else None
+        
+        # Pacing and retries are shared by every analyzer in the process; 429s
+        # are retried with backoff until latency_budget runs out
+        self.latency_budget = latency_budget
+        self.rate_limiter = get_rate_limiter(
+            f'gemini:{self.model_name}',
+            requests_per_minute=requests_per_minute,
+            tokens_per_minute=tokens_per_minute,
+            max_concurrency=max(max_concurrency, executor_workers or max_concurrency * 2)
+        )
+        
+        # While the endpoint is down, calls skip straight to the fallback
+        self.circuit_breaker = get_circuit_breaker(
+            f'gemini:{self.model_name}',
+            failure_threshold=self.CIRCUIT_FAILURE_THRESHOLD,
+            recovery_timeout=self.CIRCUIT_RECOVERY_SECONDS
+        )
     
-    async def analyze_sentiment_detailed(self, text):
-        """Get detailed sentiment analysis using Gemini AI"""
+    async def analyze_sentiment_detailed(self, text, on_partial=None, hints=None):
+        """Get detailed sentiment analysis using Gemini AI
+        
+        on_partial, if given, is called on the event loop with the validated fields
+        received so far each time sentiment or confidence completes. Callers that
+        join another caller's in-flight request only receive the final analysis.
+        hints are precomputed local results passed on to _fallback_analysis.
+        """
+        hints = hints or {}
         if not self.is_available:
-            return self._fallback_analysis(text)
+            return self._fallback_analysis(text, **hints)
         
+        # Cache hits never touch the executor
+        cache_key = self._cache_key(text)
+        cached = self.cache.get(cache_key) if self.cache is not None else None
+        if cached is not None:
+            return cached
+        
+        return await self.in_flight.do(cache_key, lambda: self._analyze_uncached(text, cache_key, on_partial, hints))
+    
+    async def _analyze_uncached(self, text, cache_key, on_partial, hints):
         try:
             prompt = f"""
             Analyze the following social media post for sentiment and provide a detailed analysis:
@@ -48,33 +141,313 @@ class GeminiSentimentAnalyzer:
             }}
             """
             
-            response = await asyncio.get_event_loop().run_in_executor(
-                None, lambda: self.model.generate_content(prompt)
-            )
+            received = {}
             
-            # Extract JSON from response
-            response_text = response.text
-            if '```json' in response_text:
-                json_str = response_text.split('```json')[1].split('```')[0].strip()
-            elif '```' in response_text:
-                json_str = response_text.split('```')[1].strip()
-            else:
-                json_str = response_text.strip()
+            def on_fields(completed):
+                received.update(self._validated_fields(completed))
+                if on_partial is not None and any(field in completed for field in EARLY_FIELDS):
+                    on_partial(dict(received))
+            
+            parser = await self._generate_fields(prompt, on_fields)
+            analysis = self._complete_analysis(text, self._validated_fields(parser.fields), hints)
             
-            analysis = json.loads(json_str)
+            # Only complete, well-formed responses are worth keeping
+            if self.cache is not None and 'fallback_fields' not in analysis:
+                self.cache.put(cache_key, analysis)
             return analysis
             
+        except CircuitOpenError:
+            return self._fallback_analysis(text, **hints)
         except Exception as e:
             print(f"❌ Gemini analysis failed: {e}")
-            return self._fallback_analysis(text)
+            return self._fallback_analysis(text, **hints)
+    
+    async def analyze_sentiment_packed(self, texts, hints=None):
+        """Analyze several posts with a single Gemini request; returns one analysis per text"""
+        hints = hints or [{}] * len(texts)
+        if not self.is_available:
+            return [self._fallback_analysis(text, **post_hints) for text, post_hints in zip(texts, hints)]
+        if not texts:
+            return []
+        
+        # Only posts missing from the cache go into the prompt
+        cache_keys = [self._cache_key(text, 'packed') for text in texts]
+        results = [self.cache.get(key) if self.cache is not None else None for key in cache_keys]
+        missing = [i for i, result in enumerate(results) if result is None]
+        if not missing:
+            return results
+        
+        posts_block = "\n".join(
+            f'{position}: {json.dumps(texts[i], ensure_ascii=False)}' for position, i in enumerate(missing)
+        )
+        prompt = f"""
+            Analyze each of the following social media posts for sentiment.
+            Posts are listed one per line as index: "text".
+            
+            {posts_block}
+            
+            Respond with only a JSON array containing one object per post, in this format:
+            [
+                {{
+                    "index": 0,
+                    "sentiment": "positive/neutral/negative",
+                    "confidence": 0.0-1.0,
+                    "emotional_tone": ["adjective1", "adjective2"],
+                    "key_topics": ["topic1", "topic2"],
+                    "summary": "brief summary of sentiment",
+                    "reasoning": "explanation of why this sentiment was determined",
+                    "intensity": "low/medium/high"
+                }}
+            ]
+            """
+        
+        try:
+            response_text = await self._generate(prompt, expected_posts=len(missing))
+            entries = self._parse_packed_response(response_text, len(missing))
+        except CircuitOpenError:
+            entries = {}
+        except Exception as e:
+            print(f"❌ Gemini packed analysis failed: {e}")
+            entries = {}
+        
+        # Each entry is completed like a single-post response: malformed or missing
+        # fields fall back per field, and entries with nothing usable per post
+        completed = {}
+        for position, i in enumerate(missing):
+            if position in entries:
+                try:
+                    completed[position] = self._complete_analysis(texts[i], entries[position], hints[i])
+                except ValueError:
+                    pass
+            results[i] = completed.get(position) or self._fallback_analysis(texts[i], **hints[i])
+        
+        # Only entries that passed validation in full are worth keeping
+        complete = [(cache_keys[missing[position]], analysis) for position, analysis in completed.items()
+                    if 'fallback_fields' not in analysis]
+        if self.cache is not None and complete:
+            self.cache.put_many(complete)
+        return results
+    
+    def pack_posts(self, items):
+        """Group (index, text) pairs into packs that fit the prompt token budget"""
+        packs = []
+        current = []
+        current_tokens = 0
+        for item in items:
+            tokens = self._estimate_tokens(item[1]) + self.PACKED_ITEM_OVERHEAD_TOKENS
+            if current and (current_tokens + tokens > self.pack_token_budget
+                            or len(current) >= self.max_pack_size):
+                packs.append(current)
+                current = []
+                current_tokens = 0
+            # A post larger than the whole budget still goes out, in a pack of its own
+            current.append(item)
+            current_tokens += tokens
+        if current:
+            packs.append(current)
+        return packs
+    
+    def _cache_key(self, text, template='single'):
+        return GeminiCache.make_key(text, self.model_name, template)
+    
+    @staticmethod
+    def _estimate_tokens(text):
+        """Cheap token estimate (about four characters per token)"""
+        return len(text) // 4 + 1
+    
+    async def _generate(self, prompt, expected_posts=1):
+        """Run one rate-limited generate_content call on the Gemini thread pool and return its text"""
+        tokens = self._estimate_tokens(prompt) + expected_posts * self.RESPONSE_TOKENS_PER_POST
+        
+        def call():
+            # Runs in the executor thread, so limiter waits never block the event loop
+            return self.rate_limiter.call(
+                lambda: self.backend.generate(prompt, timeout=self.request_timeout),
+                tokens=tokens,
+                latency_budget=self.latency_budget,
+                is_retryable=self._is_retryable_error
+            )
+        
+        return await self._run_guarded(call)
     
-    def _fallback_analysis(self, text):
-        """Fallback analysis when Gemini is unavailable"""
-        from textblob import TextBlob
+    async def _generate_fields(self, prompt, on_fields=None):
+        """Run one rate-limited request and parse the JSON object in the completion incrementally
         
-        # Use TextBlob for fallback
-        blob = TextBlob(text)
-        polarity = blob.sentiment.polarity
+        Fields are handed to on_fields on the event loop as each one completes.
+        A stream that breaks after the object has started keeps the fields parsed so far.
+        """
+        loop = asyncio.get_running_loop()
+        stream = getattr(self.backend, 'generate_stream', None) if self.stream else None
+        
+        def consume():
+            parser = IncrementalJSONObjectParser()
+            chunks = (stream(prompt, timeout=self.request_timeout) if stream is not None
+                      else [self.backend.generate(prompt, timeout=self.request_timeout)])
+            try:
+                for chunk in chunks:
+                    completed = parser.feed(chunk)
+                    if completed and on_fields is not None:
+                        loop.call_soon_threadsafe(on_fields, completed)
+                    if parser.complete:
+                        break
+            except Exception as e:
+                # Nothing usable yet: let the rate limiter retry the whole request
+                if not parser.fields:
+                    raise
+                print(f"⚠️ Gemini stream interrupted, keeping {len(parser.fields)} fields: {e}")
+            return parser
+        
+        tokens = self._estimate_tokens(prompt) + self.RESPONSE_TOKENS_PER_POST
+        
+        def call():
+            return self.rate_limiter.call(
+                consume,
+                tokens=tokens,
+                latency_budget=self.latency_budget,
+                is_retryable=self._is_retryable_error
+            )
+        
+        return await self._run_guarded(call)
+    
+    async def _run_guarded(self, call):
+        """Run a backend call on the Gemini thread pool behind the circuit breaker"""
+        # An open circuit refuses in microseconds, before any thread or limiter work
+        self.circuit_breaker.check()
+        try:
+            # The budget bounds admission and retries; the last attempt may still run a full request_timeout
+            result = await asyncio.wait_for(
+                asyncio.get_running_loop().run_in_executor(self.executor, call),
+                timeout=self.latency_budget + self.request_timeout
+            )
+        except (RateLimitTimeout, asyncio.CancelledError):
+            # Local pacing or a cancelled caller says nothing about the endpoint
+            self.circuit_breaker.record_abandoned()
+            raise
+        except Exception as e:
+            if self._is_endpoint_error(e):
+                self.circuit_breaker.record_failure()
+            else:
+                # A blocked or rejected prompt: the endpoint answered, only this request was bad
+                self.circuit_breaker.record_success()
+            raise
+        self.circuit_breaker.record_success()
+        return result
+    
+    @staticmethod
+    def _validated_fields(fields):
+        """Keep the analysis fields that have a usable value, normalized"""
+        valid = {}
+        sentiment = fields.get('sentiment')
+        if isinstance(sentiment, str) and sentiment.strip().lower() in GEMINI_SENTIMENTS:
+            valid['sentiment'] = sentiment.strip().lower()
+        confidence = fields.get('confidence')
+        if isinstance(confidence, (int, float)) and not isinstance(confidence, bool) and 0.0 <= confidence <= 1.0:
+            valid['confidence'] = float(confidence)
+        for field in ('emotional_tone', 'key_topics'):
+            value = fields.get(field)
+            if isinstance(value, list) and all(isinstance(item, str) for item in value):
+                valid[field] = value
+        for field in ('summary', 'reasoning'):
+            value = fields.get(field)
+            if isinstance(value, str) and value.strip():
+                valid[field] = value
+        intensity = fields.get('intensity')
+        if isinstance(intensity, str) and intensity.strip().lower() in GEMINI_INTENSITIES:
+            valid['intensity'] = intensity.strip().lower()
+        return valid
+    
+    def _complete_analysis(self, text, fields, hints=None):
+        """Fill any missing or malformed field from the fallback analysis"""
+        missing = [field for field in ANALYSIS_FIELDS if field not in fields]
+        if not missing:
+            return dict(fields)
+        if len(missing) == len(ANALYSIS_FIELDS):
+            raise ValueError("No usable fields in Gemini response")
+        
+        fallback = self._fallback_analysis(text, **(hints or {}))
+        analysis = {field: fields[field] if field in fields else fallback[field] for field in ANALYSIS_FIELDS}
+        analysis['fallback_fields'] = missing
+        return analysis
+    
+    @classmethod
+    def _is_retryable_error(cls, error):
+        if type(error).__name__ in cls.RETRYABLE_ERRORS:
+            return True
+        message = str(error).lower()
+        return '429' in message or 'quota' in message or 'rate limit' in message
+    
+    @classmethod
+    def _is_endpoint_error(cls, error):
+        """Whether an error says the endpoint is unhealthy (timeouts, connection errors, 429/5xx)
+        
+        Errors about one prompt, such as a safety block or a 400, must not open
+        the circuit shared by every session.
+        """
+        if cls._is_retryable_error(error):
+            return True
+        # HTTP errors from urllib and the Google client carry their status code
+        status = getattr(error, 'code', None)
+        if isinstance(status, int) and not isinstance(status, bool):
+            return status == 429 or status >= 500
+        return isinstance(error, (TimeoutError, asyncio.TimeoutError, OSError)) or type(error).__name__ == 'RetryError'
+    
+    def rate_limit_metrics(self):
+        """Current Gemini concurrency limit, queue depth, retry counters and circuit state"""
+        metrics = self.rate_limiter.metrics()
+        metrics['circuit'] = self.circuit_breaker.stats()
+        return metrics
+    
+    @staticmethod
+    def _extract_json(response_text):
+        """Strip markdown code fences from a model response"""
+        if '```json' in response_text:
+            return response_text.split('```json')[1].split('```')[0].strip()
+        elif '```' in response_text:
+            return response_text.split('```')[1].strip()
+        return response_text.strip()
+    
+    def _parse_packed_response(self, response_text, count):
+        """Map pack positions to their validated fields, skipping entries with none"""
+        json_str = self._extract_json(response_text)
+        try:
+            data = json.loads(json_str)
+        except json.JSONDecodeError:
+            # Tolerate chatter around the array
+            start, end = json_str.find('['), json_str.rfind(']')
+            if start == -1 or end <= start:
+                return {}
+            data = json.loads(json_str[start:end + 1])
+        
+        if isinstance(data, dict):
+            data = data.get('results', data.get('posts', []))
+        if not isinstance(data, list):
+            return {}
+        
+        entries = {}
+        for position, entry in enumerate(data):
+            if not isinstance(entry, dict):
+                continue
+            index = entry.pop('index', position)
+            try:
+                index = int(index)
+            except (TypeError, ValueError):
+                continue
+            if not 0 <= index < count or index in entries:
+                continue
+            fields = self._validated_fields(entry)
+            if fields:
+                entries[index] = fields
+        return entries
+    
+    def _fallback_analysis(self, text, polarity=None, emotions=None):
+        """Fallback analysis when Gemini is unavailable
+        
+        polarity (TextBlob's -1..1 polarity) and emotions (detected emotion
+        labels) can be passed in when the local pipeline already computed them.
+        """
+        if polarity is None:
+            # Use TextBlob's pattern analyzer for fallback
+            polarity = pattern_sentiment(text)[0]
         
         # Determine sentiment
         if polarity > 0.1:
@@ -94,15 +467,29 @@ class GeminiSentimentAnalyzer:
         return {
             "sentiment": sentiment,
             "confidence": round(confidence, 2),
-            "emotional_tone": self._get_emotional_tone(text, sentiment),
+            "emotional_tone": self._get_emotional_tone(text, sentiment, emotions),
             "key_topics": key_topics,
             "summary": f"Text appears {sentiment} based on linguistic analysis",
             "reasoning": f"Determined through polarity analysis (polarity: {polarity:.2f})",
             "intensity": "high" if abs(polarity) > 0.5 else "medium" if abs(polarity) > 0.2 else "low"
         }
     
-    def _get_emotional_tone(self, text, sentiment):
-        """Extract emotional tone from text"""
+    # Tone words for the emotion labels detected by EnhancedSentimentAnalyzer
+    EMOTION_TONES = {
+        "joy": "happy",
+        "anger": "angry",
+        "sadness": "disappointed",
+        "fear": "concerned",
+        "surprise": "surprised"
+    }
+    
+    def _get_emotional_tone(self, text, sentiment, emotions=None):
+        """Extract emotional tone from text, or from already detected emotions"""
+        if emotions is not None:
+            tone_words = [self.EMOTION_TONES[emotion] for emotion in emotions if emotion in self.EMOTION_TONES]
+            if tone_words:
+                return tone_words
+        
         emotional_words = {
             "positive": ["excited", "happy", "optimistic", "enthusiastic", "pleased"],
             "negative": ["frustrated", "angry", "disappointed", "concerned", "annoyed"],
@@ -122,32 +509,83 @@ class GeminiSentimentAnalyzer:
         
         return tone_words
     
-    async def analyze_batch_posts(self, posts, max_analyze=10):
+    @staticmethod
+    def _fallback_hints(post):
+        """Precomputed TextBlob polarity and emotions carried by a scored post"""
+        hints = {}
+        # Only TextBlob's polarity matches what the fallback would compute; the combined score does not
+        polarity = post.get('textblob_polarity')
+        if isinstance(polarity, numbers.Real) and not isinstance(polarity, bool) and polarity == polarity:
+            hints['polarity'] = float(polarity)
+        emotions = post.get('emotions')
+        if isinstance(emotions, (list, tuple)):
+            hints['emotions'] = list(emotions)
+        return hints
+    
+    async def analyze_batch_posts(self, posts, max_analyze=10, packed=False, on_partial=None):
         """Analyze a batch of posts (limit to avoid rate limits)"""
         if not self.is_available:
             return {}
         
         analyzed_posts = {}
-        tasks = []
+        async for i, analysis in self.iter_batch_analyses(posts, max_analyze, packed=packed, on_partial=on_partial):
+            analyzed_posts[i] = analysis
+        
+        # Completion order is arbitrary; hand results back in post order
+        return dict(sorted(analyzed_posts.items()))
+    
+    async def iter_batch_analyses(self, posts, max_analyze=10, packed=False, on_partial=None):
+        """Yield (post index, analysis) pairs as each concurrent analysis completes
+        
+        on_partial(index, fields) receives early sentiment/confidence results in
+        unpacked mode, before the full analysis for that post is yielded.
+        """
+        if not self.is_available:
+            return
         
         # Limit the number of posts to analyze with Gemini
         posts_to_analyze = posts[:max_analyze]
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        items = [
+            (i, post['text']) for i, post in enumerate(posts_to_analyze)
+            if isinstance(post, dict) and 'text' in post
+        ]
+        # Local results already on the posts make any fallback nearly free
+        hints = {i: self._fallback_hints(posts_to_analyze[i]) for i, _ in items}
         
-        for i, post in enumerate(posts_to_analyze):
-            if isinstance(post, dict) and 'text' in post:
-                task = self.analyze_sentiment_detailed(post['text'])
-                tasks.append((i, task))
+        # Each request covers one post, or a whole pack of posts in packed mode
+        async def analyze_group(group):
+            texts = [text for _, text in group]
+            group_hints = [hints[i] for i, _ in group]
+            async with semaphore:
+                try:
+                    if packed:
+                        analyses = await self.analyze_sentiment_packed(texts, group_hints)
+                    else:
+                        index = group[0][0]
+                        partial_callback = None if on_partial is None else (
+                            lambda fields: on_partial(index, fields)
+                        )
+                        analyses = [await self.analyze_sentiment_detailed(
+                            texts[0], on_partial=partial_callback, hints=group_hints[0]
+                        )]
+                except Exception as e:
+                    print(f"Error analyzing posts {[i for i, _ in group]}: {e}")
+                    analyses = [self._fallback_analysis(text, **post_hints)
+                                for text, post_hints in zip(texts, group_hints)]
+            return [(i, analysis) for (i, _), analysis in zip(group, analyses)]
         
-        # Process analyses concurrently
-        for i, task in tasks:
-            try:
-                analysis = await task
-                analyzed_posts[i] = analysis
-            except Exception as e:
-                print(f"Error analyzing post {i}: {e}")
-                analyzed_posts[i] = self._fallback_analysis(posts[i]['text'])
+        groups = self.pack_posts(items) if packed else [[item] for item in items]
+        tasks = [asyncio.ensure_future(analyze_group(group)) for group in groups]
         
-        return analyzed_posts
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                for result in await next_done:
+                    yield result
+        finally:
+            # Consumers that stop early should not leave requests running
+            for task in tasks:
+                task.cancel()
 
 # Test the Gemini analyzer
 async def test_gemini_analyzer():
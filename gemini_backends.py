@@ -0,0 +1,328 @@
+import google.generativeai as genai
+import hashlib
+import itertools
+import codecs
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from textblob.en import sentiment as pattern_sentiment
+
+class ResourceExhausted(Exception):
+    """Stand-in for the 429 quota error raised by the Gemini client"""
+
+class ServiceUnavailable(Exception):
+    """Stand-in for a transient 5xx error raised by the Gemini client"""
+
+class GenAIBackend:
+    """Backend that calls the real Gemini API through google.generativeai"""
+
+    def __init__(self, api_key, model_name='gemini-1.5-pro-latest'):
+        self.model_name = model_name
+        genai.configure(api_key=api_key)
+        self.model = genai.GenerativeModel(model_name)
+
+    def generate(self, prompt, timeout):
+        """Send one prompt and return the completion text"""
+        response = self.model.generate_content(prompt, request_options={'timeout': timeout})
+        return response.text
+
+    def generate_stream(self, prompt, timeout):
+        """Send one prompt and yield completion text as chunks arrive"""
+        response = self.model.generate_content(prompt, stream=True, request_options={'timeout': timeout})
+        for chunk in response:
+            yield chunk.text
+
+class StandInBackend:
+    """Offline Gemini replacement returning schema-valid analyses with simulated latency and errors"""
+
+    LATENCY_DISTRIBUTIONS = ('fixed', 'uniform', 'exponential', 'lognormal')
+
+    # Prompt lines the analyzer uses for single and packed requests
+    SINGLE_POST_PATTERN = re.compile(r'Post: "(.*?)"\s*\n\s*Please provide analysis', re.DOTALL)
+    PACKED_POST_PATTERN = re.compile(r'^\s*(\d+): (".*")\s*$', re.MULTILINE)
+
+    def __init__(self, latency='lognormal', mean_latency=0.3, latency_spread=0.5, error_rate=0.0,
+                 rate_limit_rate=0.0, seed=None, model_name='gemini-stand-in', chunk_size=32, chunk_interval=0.01):
+        if latency not in self.LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"Unknown latency distribution '{latency}', expected one of {list(self.LATENCY_DISTRIBUTIONS)}")
+        self.model_name = model_name
+        self.latency = latency
+        self.mean_latency = mean_latency
+        self.latency_spread = latency_spread
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        # Streaming splits the completion into chunk_size characters every chunk_interval seconds
+        self.chunk_size = chunk_size
+        self.chunk_interval = chunk_interval
+
+        # One seeded generator shared by all threads keeps runs reproducible
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    def generate(self, prompt, timeout=None):
+        """Sleep for a sampled latency, then fail or return a JSON completion for the prompt"""
+        self._wait_for_response(timeout)
+        return self.respond(prompt)
+
+    def generate_stream(self, prompt, timeout=None):
+        """Like generate, but yield the completion in timed chunks"""
+        self._wait_for_response(timeout)
+        text = self.respond(prompt)
+        for start in range(0, len(text), self.chunk_size):
+            if start:
+                time.sleep(self.chunk_interval)
+            yield text[start:start + self.chunk_size]
+
+    def _wait_for_response(self, timeout):
+        """Simulate time to first byte and injected failures"""
+        with self._lock:
+            self.calls += 1
+            delay = self._sample_latency()
+            outcome = self._random.random()
+
+        if timeout is not None and delay > timeout:
+            time.sleep(timeout)
+            raise TimeoutError(f"Stand-in request exceeded {timeout}s")
+        time.sleep(delay)
+
+        if outcome < self.rate_limit_rate:
+            raise ResourceExhausted("429 Resource has been exhausted (stand-in quota)")
+        if outcome < self.rate_limit_rate + self.error_rate:
+            raise ServiceUnavailable("503 The service is currently unavailable (stand-in)")
+
+    def respond(self, prompt):
+        """Completion text for a prompt, without latency or injected errors"""
+        packed = [(int(index), json.loads(text)) for index, text in self.PACKED_POST_PATTERN.findall(prompt)]
+        if packed:
+            analyses = [dict(self.analyze(text), index=index) for index, text in packed]
+            return "```json\n" + json.dumps(analyses, indent=2) + "\n```"
+
+        match = self.SINGLE_POST_PATTERN.search(prompt)
+        text = match.group(1) if match else prompt
+        return "```json\n" + json.dumps(self.analyze(text), indent=2) + "\n```"
+
+    @staticmethod
+    def analyze(text):
+        """Deterministic analysis in the same schema the Gemini prompts ask for"""
+        polarity, subjectivity = pattern_sentiment(text)
+        if polarity > 0.1:
+            sentiment = 'positive'
+        elif polarity < -0.1:
+            sentiment = 'negative'
+        else:
+            sentiment = 'neutral'
+
+        words = [word.strip('.,!?#@"\'') for word in text.lower().split()]
+        key_topics = [word for word in words if len(word) > 4 and word.isalpha()][:3]
+        tones = {
+            'positive': ['optimistic', 'pleased'],
+            'negative': ['frustrated', 'disappointed'],
+            'neutral': ['observant', 'analytical']
+        }
+        # Stable per-text jitter so confidences are not all identical
+        jitter = int(hashlib.blake2b(text.encode('utf-8'), digest_size=2).hexdigest(), 16) / 0xFFFF * 0.1
+        return {
+            'sentiment': sentiment,
+            'confidence': round(min(0.5 + abs(polarity) / 2 + jitter, 0.99), 2),
+            'emotional_tone': tones[sentiment],
+            'key_topics': key_topics,
+            'summary': f"Post reads as {sentiment}",
+            'reasoning': f"Stand-in polarity {polarity:.2f}, subjectivity {subjectivity:.2f}",
+            'intensity': 'high' if abs(polarity) > 0.5 else 'medium' if abs(polarity) > 0.2 else 'low'
+        }
+
+    def _sample_latency(self):
+        if self.mean_latency <= 0:
+            return 0.0
+        if self.latency == 'fixed':
+            return self.mean_latency
+        if self.latency == 'uniform':
+            half_width = self.mean_latency * self.latency_spread
+            return self._random.uniform(self.mean_latency - half_width, self.mean_latency + half_width)
+        if self.latency == 'exponential':
+            return self._random.expovariate(1.0 / self.mean_latency)
+        # Lognormal with the requested mean; latency_spread is sigma of the underlying normal
+        sigma = self.latency_spread
+        return self._random.lognormvariate(math.log(self.mean_latency) - sigma ** 2 / 2, sigma)
+
+class HTTPBackend:
+    """Backend that calls a StandInServer (or any compatible endpoint) over HTTP"""
+
+    def __init__(self, base_url, model_name='gemini-stand-in'):
+        self.base_url = base_url.rstrip('/')
+        self.model_name = model_name
+
+    def generate(self, prompt, timeout):
+        """POST the prompt and return the completion text, mapping 429/5xx to client-style errors"""
+        with self._post('/generate', prompt, timeout) as response:
+            return json.loads(response.read())['text']
+
+    def generate_stream(self, prompt, timeout):
+        """POST the prompt to the streaming endpoint and yield text as it arrives"""
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        with self._post('/stream', prompt, timeout) as response:
+            while True:
+                data = response.read1(4096)
+                if not data:
+                    break
+                text = decoder.decode(data)
+                if text:
+                    yield text
+        tail = decoder.decode(b'', final=True)
+        if tail:
+            yield tail
+
+    def _post(self, path, prompt, timeout):
+        request = urllib.request.Request(
+            self.base_url + path,
+            data=json.dumps({'prompt': prompt}).encode('utf-8'),
+            headers={'Content-Type': 'application/json'}
+        )
+        try:
+            return urllib.request.urlopen(request, timeout=timeout)
+        except urllib.error.HTTPError as e:
+            if e.code == 429:
+                raise ResourceExhausted(f"429 {e.reason}") from e
+            if e.code >= 500:
+                raise ServiceUnavailable(f"{e.code} {e.reason}") from e
+            raise
+
+class StandInServer:
+    """Localhost HTTP server exposing a StandInBackend at POST /generate and POST /stream"""
+
+    def __init__(self, host='127.0.0.1', port=0, **stand_in_config):
+        self.backend = StandInBackend(**stand_in_config)
+        backend = self.backend
+
+        class Handler(BaseHTTPRequestHandler):
+            # Chunked responses need HTTP/1.1
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(self):
+                if self.path not in ('/generate', '/stream'):
+                    self._send(404, {'error': 'not found'})
+                    return
+                length = int(self.headers.get('Content-Length', 0))
+                try:
+                    prompt = json.loads(self.rfile.read(length))['prompt']
+                except (ValueError, KeyError):
+                    self._send(400, {'error': 'expected {"prompt": ...}'})
+                    return
+                try:
+                    if self.path == '/stream':
+                        self._send_stream(backend.generate_stream(prompt))
+                    else:
+                        self._send(200, {'text': backend.generate(prompt)})
+                except ResourceExhausted as e:
+                    self._send(429, {'error': str(e)})
+                except ServiceUnavailable as e:
+                    self._send(503, {'error': str(e)})
+
+            def _send(self, status, payload):
+                body = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _send_stream(self, chunks):
+                # Pull the first chunk before the headers so injected errors still map to a status
+                chunks = iter(chunks)
+                first = next(chunks, '')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; charset=utf-8')
+                self.send_header('Transfer-Encoding', 'chunked')
+                self.end_headers()
+                for chunk in itertools.chain([first], chunks):
+                    data = chunk.encode('utf-8')
+                    if data:
+                        self.wfile.write(f"{len(data):X}\r\n".encode('ascii') + data + b"\r\n")
+                        self.wfile.flush()
+                self.wfile.write(b"0\r\n\r\n")
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """Serve in a daemon thread and return the base URL"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._server.serve_forever, name='gemini-stand-in', daemon=True)
+            self._thread.start()
+        return self.url
+
+    def serve_forever(self):
+        """Serve in the calling thread until interrupted"""
+        try:
+            self._server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._server.server_close()
+
+    def stop(self):
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._server.server_close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+def backend_from_env():
+    """Backend selected by GEMINI_BACKEND ('stand-in' or an http:// URL), or None for the real API"""
+    choice = os.getenv('GEMINI_BACKEND', '').strip()
+    if not choice:
+        return None
+    if choice.startswith(('http://', 'https://')):
+        return HTTPBackend(choice)
+    if choice in ('stand-in', 'standin'):
+        return StandInBackend(
+            mean_latency=float(os.getenv('GEMINI_STAND_IN_LATENCY', '0.3')),
+            error_rate=float(os.getenv('GEMINI_STAND_IN_ERROR_RATE', '0.0')),
+            rate_limit_rate=float(os.getenv('GEMINI_STAND_IN_RATE_LIMIT_RATE', '0.0')),
+            seed=int(os.environ['GEMINI_STAND_IN_SEED']) if os.getenv('GEMINI_STAND_IN_SEED') else None
+        )
+    raise ValueError(f"Unknown GEMINI_BACKEND '{choice}'")
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run the Gemini stand-in server")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', default='lognormal', choices=StandInBackend.LATENCY_DISTRIBUTIONS)
+    parser.add_argument('--mean-latency', type=float, default=0.3)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    server = StandInServer(
+        port=args.port, latency=args.latency, mean_latency=args.mean_latency,
+        error_rate=args.error_rate, rate_limit_rate=args.rate_limit_rate, seed=args.seed
+    )
+    print(f"Gemini stand-in listening on {server.url} (set GEMINI_BACKEND={server.url})")
+    server.serve_forever()
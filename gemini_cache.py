@@ -0,0 +1,167 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from score_cache import ScoreCache
+
+# Bump a template's version whenever its prompt or response validation changes so
+# stale analyses are not reused; each template also keys its own entries
+PROMPT_VERSIONS = {
+    'single': 2,
+    'packed': 2
+}
+
+DEFAULT_GEMINI_CACHE_PATH = os.getenv('GEMINI_CACHE_PATH', os.path.join('.cache', 'gemini_analyses.sqlite'))
+
+class GeminiCache:
+    """Disk-backed cache of Gemini analyses shared across sessions and processes"""
+
+    def __init__(self, path=DEFAULT_GEMINI_CACHE_PATH, ttl_seconds=24 * 60 * 60, max_entries=20000,
+                 memory_entries=2000):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+
+        # Small in-process tier so repeat hits skip SQLite entirely
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        # SQLite connections are not shared between threads
+        self._local = threading.local()
+        self._writes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.available = True
+
+        try:
+            directory = os.path.dirname(os.path.abspath(path))
+            os.makedirs(directory, exist_ok=True)
+            connection = self._connection()
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS analyses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS analyses_created_at ON analyses (created_at)")
+            connection.commit()
+        except (OSError, sqlite3.Error) as e:
+            print(f"⚠️ Gemini cache unavailable: {e}")
+            self.available = False
+
+    @staticmethod
+    def make_key(text, model_name, template='single'):
+        """Hash the normalized text together with the model, prompt template and its version"""
+        version = PROMPT_VERSIONS[template]
+        payload = f"{model_name}\0{template}:{version}\0{ScoreCache.normalize(text)}".encode('utf-8')
+        return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+    def get(self, key):
+        """Return the cached analysis for key, or None on a miss or an expired entry"""
+        if not self.available:
+            return None
+
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                created_at, analysis = entry
+                if now - created_at <= self.ttl_seconds:
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    return dict(analysis)
+                del self._memory[key]
+
+        try:
+            row = self._connection().execute(
+                "SELECT value, created_at FROM analyses WHERE key = ? AND created_at >= ?",
+                (key, now - self.ttl_seconds)
+            ).fetchone()
+        except sqlite3.Error as e:
+            print(f"⚠️ Gemini cache read failed: {e}")
+            row = None
+
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            analysis = json.loads(row[0])
+            self._remember(key, row[1], analysis)
+        return dict(analysis)
+
+    def put(self, key, analysis):
+        """Store an analysis, trimming expired and excess rows now and then"""
+        self.put_many([(key, analysis)])
+
+    def put_many(self, items):
+        """Store several analyses with a single commit"""
+        if not self.available or not items:
+            return
+
+        now = time.time()
+        with self._lock:
+            for key, analysis in items:
+                self._remember(key, now, dict(analysis))
+            self._writes += len(items)
+            prune = self._writes >= 100
+            if prune:
+                self._writes = 0
+
+        try:
+            connection = self._connection()
+            connection.executemany(
+                "INSERT OR REPLACE INTO analyses (key, value, created_at) VALUES (?, ?, ?)",
+                [(key, json.dumps(analysis), now) for key, analysis in items]
+            )
+            if prune:
+                self._prune(connection, now)
+            connection.commit()
+        except sqlite3.Error as e:
+            print(f"⚠️ Gemini cache write failed: {e}")
+
+    def stats(self):
+        """Return hit/miss counters and the number of stored analyses"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            stats = {
+                'memory_entries': len(self._memory),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': (self.hits / lookups) if lookups else 0.0
+            }
+        try:
+            (stats['disk_entries'],) = self._connection().execute("SELECT COUNT(*) FROM analyses").fetchone()
+        except sqlite3.Error:
+            stats['disk_entries'] = None
+        return stats
+
+    def _remember(self, key, created_at, analysis):
+        self._memory[key] = (created_at, analysis)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _prune(self, connection, now):
+        connection.execute("DELETE FROM analyses WHERE created_at < ?", (now - self.ttl_seconds,))
+        (count,) = connection.execute("SELECT COUNT(*) FROM analyses").fetchone()
+        excess = count - self.max_entries
+        if excess > 0:
+            connection.execute(
+                "DELETE FROM analyses WHERE key IN "
+                "(SELECT key FROM analyses ORDER BY created_at LIMIT ?)",
+                (excess,)
+            )
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            # WAL lets readers in other sessions and processes proceed during a write
+            connection = sqlite3.connect(self.path, timeout=5.0)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
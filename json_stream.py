@@ -0,0 +1,207 @@
+import json
+
+_WHITESPACE = ' \t\r\n'
+_VALUE_END = ',}' + _WHITESPACE
+
+class IncrementalJSONObjectParser:
+    """Parses the top-level fields of a JSON object as its text arrives in chunks"""
+
+    def __init__(self):
+        self.fields = {}
+        # Keys whose values arrived but were not valid JSON
+        self.malformed = set()
+        self.started = False
+        self.complete = False
+
+        self._buffer = ''
+        self._pos = 0
+        self._state = 'start'
+        self._key = None
+
+    def feed(self, chunk):
+        """Add text and return the fields completed by it, in arrival order"""
+        self._buffer += chunk
+        completed = {}
+        while not self.complete:
+            if not self._step(completed):
+                break
+        # Drop consumed text so long responses do not rescan from the start
+        if self._pos > 4096:
+            self._buffer = self._buffer[self._pos:]
+            self._pos = 0
+        return completed
+
+    def _step(self, completed):
+        """Advance one token; returns False when more input is needed"""
+        buffer = self._buffer
+        if self._state == 'start':
+            # Anything before the object (prose, ```json fences) is ignored
+            start = buffer.find('{', self._pos)
+            if start == -1:
+                self._pos = len(buffer)
+                return False
+            self.started = True
+            self._pos = start + 1
+            self._state = 'key'
+            return True
+
+        pos = self._skip(_WHITESPACE + ',')
+        if pos >= len(buffer):
+            return False
+        char = buffer[pos]
+
+        if self._state == 'key':
+            if char == '}':
+                self._pos = pos + 1
+                self.complete = True
+                return False
+            if char != '"':
+                # Unquoted junk: resynchronise on the next quote
+                next_quote = buffer.find('"', pos)
+                if next_quote == -1:
+                    self._pos = len(buffer)
+                    return False
+                pos = next_quote
+            end = self._string_end(pos)
+            if end is None:
+                return False
+            self._key = self._loads(buffer[pos:end])
+            self._pos = end
+            self._state = 'colon'
+            return True
+
+        if self._state == 'colon':
+            self._pos = pos + 1 if char == ':' else pos
+            self._state = 'value'
+            return True
+
+        # Value: find where it ends without decoding partial text
+        if char == '"':
+            end = self._string_end(pos)
+        elif char in '{[':
+            end = self._container_end(pos)
+        else:
+            end = pos
+            while end < len(buffer) and buffer[end] not in _VALUE_END:
+                end += 1
+            # A bare number or literal is only complete once something follows it
+            if end >= len(buffer):
+                end = None
+        if end is None:
+            return False
+
+        key = self._key if isinstance(self._key, str) else str(self._key)
+        try:
+            value = json.loads(buffer[pos:end])
+        except json.JSONDecodeError:
+            self.malformed.add(key)
+        else:
+            self.fields[key] = value
+            completed[key] = value
+            self.malformed.discard(key)
+        self._pos = end
+        self._state = 'key'
+        return True
+
+    def _skip(self, characters):
+        pos = self._pos
+        buffer = self._buffer
+        while pos < len(buffer) and buffer[pos] in characters:
+            pos += 1
+        self._pos = pos
+        return pos
+
+    def _string_end(self, pos):
+        """Index just past the string starting at pos, or None if it is not closed yet"""
+        buffer = self._buffer
+        i = pos + 1
+        while i < len(buffer):
+            char = buffer[i]
+            if char == '\\':
+                i += 2
+                continue
+            if char == '"':
+                return i + 1
+            i += 1
+        return None
+
+    def _container_end(self, pos):
+        """Index just past the array/object starting at pos, or None if it is not closed yet"""
+        buffer = self._buffer
+        depth = 0
+        i = pos
+        while i < len(buffer):
+            char = buffer[i]
+            if char == '"':
+                end = self._string_end(i)
+                if end is None:
+                    return None
+                i = end
+                continue
+            if char in '{[':
+                depth += 1
+            elif char in '}]':
+                depth -= 1
+                if depth == 0:
+                    return i + 1
+            i += 1
+        return None
+
+    @staticmethod
+    def _loads(text):
+        try:
+            return json.loads(text)
+        except json.JSONDecodeError:
+            return text.strip('"')
+
+class NDJSONParser:
+    """Splits newline-delimited JSON arriving in arbitrary byte chunks into objects
+
+    Blank lines (the keep-alive a streaming endpoint sends while idle) are
+    counted rather than parsed. A line that is not valid JSON, or that grows
+    past max_line_bytes without a newline, is dropped and counted.
+    """
+
+    def __init__(self, max_line_bytes=1 << 20):
+        self.max_line_bytes = max_line_bytes
+        self.keepalives = 0
+        self.malformed = 0
+
+        self._buffer = bytearray()
+        self._overflow = False
+
+    def feed(self, chunk):
+        """Add bytes and return the objects completed by them, in order"""
+        self._buffer += chunk
+        objects = []
+        start = 0
+        while True:
+            end = self._buffer.find(b'\n', start)
+            if end == -1:
+                break
+            line = bytes(self._buffer[start:end]).strip()
+            start = end + 1
+            if self._overflow:
+                # Tail of a line that was already dropped
+                self._overflow = False
+                continue
+            if not line:
+                self.keepalives += 1
+                continue
+            try:
+                objects.append(json.loads(line))
+            except (ValueError, UnicodeDecodeError):
+                self.malformed += 1
+        del self._buffer[:start]
+
+        if len(self._buffer) > self.max_line_bytes:
+            self._buffer.clear()
+            if not self._overflow:
+                self.malformed += 1
+            self._overflow = True
+        return objects
+
+    def reset(self):
+        """Forget any partial line, e.g. after the connection dropped"""
+        self._buffer.clear()
+        self._overflow = False
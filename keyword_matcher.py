@@ -0,0 +1,66 @@
+from collections import deque
+
+class KeywordAutomaton:
+    """Aho-Corasick automaton that finds which keyword groups occur in a text in one pass"""
+
+    def __init__(self, keyword_groups):
+        # keyword_groups maps a label (e.g. an emotion) to its keywords
+        self.labels = list(keyword_groups)
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [frozenset()]
+
+        outputs = [set()]
+        for label, keywords in keyword_groups.items():
+            for keyword in keywords:
+                if keyword:
+                    outputs[self._insert(keyword, outputs)].add(label)
+
+        self._build_failure_links(outputs)
+
+    def find_labels(self, text):
+        """Return the set of labels whose keywords occur anywhere in text"""
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        all_labels = len(self.labels)
+
+        found = set()
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                found |= output[state]
+                if len(found) == all_labels:
+                    break
+        return found
+
+    def _insert(self, keyword, outputs):
+        state = 0
+        for char in keyword:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                outputs.append(set())
+            state = next_state
+        return state
+
+    def _build_failure_links(self, outputs):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                # Breadth-first order means the fail target's outputs are final
+                outputs[next_state] |= outputs[self._fail[next_state]]
+
+        self._output = [frozenset(labels) for labels in outputs]
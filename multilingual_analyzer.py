@@ -4,11 +4,16 @@ from textblob import TextBlob
 import asyncio
 import re
 
+from score_cache import ScoreCache
+
 # Ensure consistent language detection
 DetectorFactory.seed = 0
 
 class MultilingualSentimentAnalyzer:
-    def __init__(self):
+    def __init__(self, cache_entries=50000, cache_bytes=32 * 1024 * 1024, cache_path=None):
+        # Scores are cached per language; cache_entries=0 disables the cache
+        self.score_cache = ScoreCache(cache_entries, cache_bytes, cache_path) if cache_entries else None
+        
         self.supported_languages = ['en', 'es', 'fr', 'de', 'it', 'pt', 'nl', 'ru', 'zh', 'ja', 'ko', 'ar']
         
         # Language patterns and configurations
@@ -76,9 +81,19 @@ class MultilingualSentimentAnalyzer:
             if language_code not in self.supported_languages:
                 language_code = 'en'  # Default to English
             
+            if self.score_cache is not None:
+                key = ScoreCache.make_key(text, f"multilingual:{language_code}")
+                cached = self.score_cache.get(key)
+                if cached is not None:
+                    return cached
+            
             # Use the appropriate analyzer for the language
             analyzer_func = self.language_patterns.get(language_code, {}).get('analyzer', self._analyze_english)
-            return analyzer_func(text)
+            result = analyzer_func(text)
+            
+            if self.score_cache is not None:
+                self.score_cache.put(key, result)
+            return result
             
         except Exception as e:
             print(f"❌ Multilingual sentiment analysis failed: {e}")
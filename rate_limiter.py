@@ -0,0 +1,180 @@
+import random
+import threading
+import time
+
+class RateLimitTimeout(Exception):
+    """Raised when a call cannot be admitted or retried within its latency budget"""
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at a per-minute rate"""
+
+    def __init__(self, per_minute, capacity=None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity if capacity is not None else per_minute
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount):
+        """Take amount tokens now, going into debt if needed; returns seconds to wait"""
+        with self._lock:
+            self._refill()
+            self._tokens -= amount
+            return max(0.0, -self._tokens / self.rate)
+
+    def refund(self, amount):
+        """Give back tokens from a reservation that was abandoned"""
+        with self._lock:
+            self._refill()
+            self._tokens = min(self.capacity, self._tokens + amount)
+
+    def available(self):
+        with self._lock:
+            self._refill()
+            return self._tokens
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+class AdaptiveRateLimiter:
+    """Request/token pacing plus an AIMD concurrency limit shared by every caller in the process"""
+
+    def __init__(self, requests_per_minute=60, tokens_per_minute=120000, initial_concurrency=4,
+                 min_concurrency=1, max_concurrency=16, latency_target=10.0, decrease_factor=0.5,
+                 base_backoff=0.5, max_backoff=20.0):
+        self.request_bucket = TokenBucket(requests_per_minute)
+        self.token_bucket = TokenBucket(tokens_per_minute)
+
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.latency_target = latency_target
+        self.decrease_factor = decrease_factor
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+
+        # The limit is fractional so additive increase can grow it by 1/limit per success
+        self._limit = float(min(max(initial_concurrency, min_concurrency), max_concurrency))
+        self._in_flight = 0
+        self._waiting = 0
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+
+        self.requests = 0
+        self.throttled = 0
+        self.retries = 0
+        self.failures = 0
+        self._latency_ewma = None
+
+    @property
+    def concurrency_limit(self):
+        return max(self.min_concurrency, int(self._limit))
+
+    def call(self, fn, tokens=1, latency_budget=60.0, is_retryable=None):
+        """Run fn under the limits, retrying retryable errors with jittered backoff within the budget"""
+        deadline = time.monotonic() + latency_budget
+        attempt = 0
+        while True:
+            self._acquire(tokens, deadline)
+            started = time.monotonic()
+            try:
+                result = fn()
+            except Exception as e:
+                retryable = bool(is_retryable and is_retryable(e))
+                self._release(time.monotonic() - started, success=False, throttled=retryable)
+                if not retryable:
+                    raise
+
+                # Full jitter keeps concurrent callers from retrying in lockstep
+                backoff = random.uniform(0, min(self.max_backoff, self.base_backoff * 2 ** attempt))
+                if time.monotonic() + backoff >= deadline:
+                    with self._condition:
+                        self.failures += 1
+                    raise
+                attempt += 1
+                with self._condition:
+                    self.retries += 1
+                time.sleep(backoff)
+                continue
+
+            self._release(time.monotonic() - started, success=True)
+            return result
+
+    def metrics(self):
+        """Current limits, queue depth and counters"""
+        with self._condition:
+            return {
+                'concurrency_limit': self.concurrency_limit,
+                'in_flight': self._in_flight,
+                'queue_depth': self._waiting,
+                'requests_available': round(self.request_bucket.available(), 2),
+                'tokens_available': round(self.token_bucket.available(), 2),
+                'requests': self.requests,
+                'throttled': self.throttled,
+                'retries': self.retries,
+                'failures': self.failures,
+                'avg_latency_s': self._latency_ewma
+            }
+
+    def _acquire(self, tokens, deadline):
+        with self._condition:
+            self._waiting += 1
+            try:
+                while self._in_flight >= self.concurrency_limit:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise RateLimitTimeout("Timed out waiting for a concurrency slot")
+                    self._condition.wait(remaining)
+                self._in_flight += 1
+            finally:
+                self._waiting -= 1
+
+        # Both buckets are reserved up front so waiting callers keep their place
+        wait = max(self.request_bucket.reserve(1), self.token_bucket.reserve(tokens))
+        if time.monotonic() + wait > deadline:
+            self.request_bucket.refund(1)
+            self.token_bucket.refund(tokens)
+            with self._condition:
+                self._in_flight -= 1
+                self._condition.notify()
+            raise RateLimitTimeout(f"Rate limit wait of {wait:.1f}s exceeds the latency budget")
+        if wait > 0:
+            with self._condition:
+                self._waiting += 1
+            time.sleep(wait)
+            with self._condition:
+                self._waiting -= 1
+
+    def _release(self, latency, success, throttled=False):
+        with self._condition:
+            self._in_flight -= 1
+            self.requests += 1
+            self._latency_ewma = latency if self._latency_ewma is None else 0.8 * self._latency_ewma + 0.2 * latency
+
+            if throttled or (success and latency > self.latency_target):
+                if throttled:
+                    self.throttled += 1
+                # One multiplicative decrease per burst of congestion signals
+                now = time.monotonic()
+                if now - self._last_decrease >= max(1.0, self._latency_ewma):
+                    self._last_decrease = now
+                    self._limit = max(self.min_concurrency, self._limit * self.decrease_factor)
+            elif success:
+                # Additive increase: roughly +1 slot per window of successful requests
+                self._limit = min(self.max_concurrency, self._limit + 1.0 / self._limit)
+            else:
+                self.failures += 1
+            self._condition.notify_all()
+
+_rate_limiters = {}
+_rate_limiters_lock = threading.Lock()
+
+def get_rate_limiter(name, **config):
+    """Process-wide limiter for an endpoint; config only applies when it is first created"""
+    with _rate_limiters_lock:
+        limiter = _rate_limiters.get(name)
+        if limiter is None:
+            limiter = AdaptiveRateLimiter(**config)
+            _rate_limiters[name] = limiter
+        return limiter
@@ -0,0 +1,169 @@
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import unicodedata
+from collections import OrderedDict
+
+class ScoreCache:
+    """Bounded LRU cache for sentiment scores keyed by a hash of the normalized text"""
+
+    # Rough per-entry cost of the OrderedDict node and bookkeeping
+    ENTRY_OVERHEAD = 120
+
+    def __init__(self, max_entries=50000, max_bytes=32 * 1024 * 1024, disk_path=None, max_disk_entries=1000000):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_disk_entries = max_disk_entries
+
+        self._entries = OrderedDict()
+        self._sizes = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_hits = 0
+
+        # Optional on-disk tier so scores survive a restart
+        self._disk = None
+        self._disk_writes = 0
+        if disk_path:
+            self._open_disk(disk_path)
+
+    @staticmethod
+    def normalize(text):
+        """Normalize text so trivially different copies share a cache entry"""
+        return unicodedata.normalize('NFC', text).strip()
+
+    @classmethod
+    def make_key(cls, text, namespace=''):
+        """Hash the normalized text together with a scorer namespace"""
+        payload = f"{namespace}\0{cls.normalize(text)}".encode('utf-8')
+        return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+    def get(self, key):
+        """Return the cached value for key, or None on a miss"""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+
+            if self._disk is not None:
+                value = self._disk_get(key)
+                if value is not None:
+                    self.hits += 1
+                    self.disk_hits += 1
+                    self._store(key, value)
+                    return value
+
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        """Store a value, evicting least recently used entries as needed"""
+        self.put_many([(key, value)])
+
+    def put_many(self, items):
+        """Store several values with a single disk commit"""
+        with self._lock:
+            for key, value in items:
+                self._store(key, value)
+
+            if self._disk is not None and items:
+                self._disk_put(items)
+
+    def stats(self):
+        """Return hit/miss/eviction counters and current usage"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'disk_hits': self.disk_hits,
+                'hit_rate': (self.hits / lookups) if lookups else 0.0
+            }
+
+    def clear(self):
+        """Drop every in-memory entry (the disk tier is kept)"""
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self._bytes = 0
+
+    def _store(self, key, value):
+        if key in self._entries:
+            self._bytes -= self._sizes[key]
+            self._entries.move_to_end(key)
+
+        size = self._entry_size(key, value)
+        self._entries[key] = value
+        self._sizes[key] = size
+        self._bytes += size
+
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            old_key, _ = self._entries.popitem(last=False)
+            self._bytes -= self._sizes.pop(old_key)
+            self.evictions += 1
+
+    def _entry_size(self, key, value):
+        size = self.ENTRY_OVERHEAD + sys.getsizeof(key) + sys.getsizeof(value)
+        if isinstance(value, (tuple, list)):
+            size += sum(sys.getsizeof(item) for item in value)
+        return size
+
+    def _open_disk(self, disk_path):
+        try:
+            directory = os.path.dirname(os.path.abspath(disk_path))
+            os.makedirs(directory, exist_ok=True)
+            self._disk = sqlite3.connect(disk_path, check_same_thread=False)
+            self._disk.execute("PRAGMA journal_mode=WAL")
+            self._disk.execute("PRAGMA synchronous=NORMAL")
+            self._disk.execute("CREATE TABLE IF NOT EXISTS scores (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            self._disk.commit()
+        except Exception as e:
+            print(f"⚠️ Score cache disk tier unavailable: {e}")
+            self._disk = None
+
+    def _disk_get(self, key):
+        try:
+            row = self._disk.execute("SELECT value FROM scores WHERE key = ?", (key,)).fetchone()
+        except sqlite3.Error as e:
+            print(f"⚠️ Score cache disk read failed: {e}")
+            return None
+        if row is None:
+            return None
+        value = json.loads(row[0])
+        return tuple(value) if isinstance(value, list) else value
+
+    def _disk_put(self, items):
+        try:
+            self._disk.executemany(
+                "INSERT OR REPLACE INTO scores (key, value) VALUES (?, ?)",
+                [(key, json.dumps(value)) for key, value in items]
+            )
+            self._disk_writes += len(items)
+
+            # Trim the oldest rows now and then instead of counting on every write
+            if self._disk_writes >= 1000:
+                self._disk_writes = 0
+                (count,) = self._disk.execute("SELECT COUNT(*) FROM scores").fetchone()
+                excess = count - self.max_disk_entries
+                if excess > 0:
+                    self._disk.execute(
+                        "DELETE FROM scores WHERE rowid IN (SELECT rowid FROM scores ORDER BY rowid LIMIT ?)",
+                        (excess,)
+                    )
+            self._disk.commit()
+        except sqlite3.Error as e:
+            print(f"⚠️ Score cache disk write failed: {e}")
@@ -0,0 +1,199 @@
+import pandas as pd
+from collections import deque
+from datetime import datetime, timezone
+import time
+
+from trend_engine import SENTIMENTS, TrendEngine
+
+class IncrementalSentimentAggregator:
+    """Running sentiment aggregates over a sliding window of scored posts"""
+
+    def __init__(self, analyzer, window_size=None, max_age_seconds=None, trend_bucket=None, keep_posts=True,
+                 scoring_mode=None):
+        self.analyzer = analyzer
+        # Scorer pipeline for this aggregator's posts; None uses the analyzer default
+        self.scoring_mode = scoring_mode
+        
+        # Without kept posts only the aggregates are stored, so memory stays
+        # constant however many posts flow through; windows need the posts
+        if not keep_posts and (window_size is not None or max_age_seconds is not None):
+            raise ValueError("Sliding windows require keep_posts=True")
+        self.keep_posts = keep_posts
+        
+        # Bucket like the analyzer's own trends unless told otherwise
+        if trend_bucket is None:
+            trend_bucket = analyzer.trend_engine.bucket if hasattr(analyzer, 'trend_engine') else '1h'
+        self.trend_engine = TrendEngine(trend_bucket)
+        self.window_size = window_size
+        self.max_age_seconds = max_age_seconds
+
+        # (arrival_time, bucket, sentiment, score, post) for every post in the window
+        self._entries = deque()
+        self._counts = dict.fromkeys(SENTIMENTS, 0)
+        self._bucket_counts = {}
+        self._score_sum = 0.0
+        self._total = 0
+        # Time zone of the first aware timestamp; trends are reported in it, like analyze_posts
+        self._tz = None
+
+    def add_post(self, post):
+        """Score a single post once and fold it into the aggregates"""
+        sentiment, score = self.analyzer.classify_sentiment(post.get('text', ''), self.scoring_mode)
+        return self._add_scored(post, sentiment, score)
+
+    def add_posts(self, posts):
+        """Score a batch of new posts once and fold them into the aggregates"""
+        posts = [post for post in posts if isinstance(post, dict)]
+        if not posts:
+            return []
+
+        sentiments, scores = self.analyzer.classify_sentiments([post.get('text', '') for post in posts],
+                                                               self.scoring_mode)
+        return [self._add_scored(post, sentiment, float(score))
+                for post, sentiment, score in zip(posts, sentiments, scores)]
+
+    def add_scored_frame(self, df):
+        """Fold an already scored DataFrame (sentiment, score, created_at) into the aggregates"""
+        if df.empty:
+            return
+        if self.keep_posts:
+            for post in df.to_dict('records'):
+                self._add_scored(post, post['sentiment'], float(post['score']))
+            return
+        
+        counts = df['sentiment'].value_counts()
+        for sentiment in SENTIMENTS:
+            self._counts[sentiment] += int(counts.get(sentiment, 0))
+        self._score_sum += float(df['score'].sum())
+        self._total += len(df)
+        
+        trends = self.trend_engine.build(df['created_at'], df['sentiment'])
+        buckets = trends.index
+        if buckets.tz is not None:
+            self._remember_tz(buckets.tz)
+            buckets = buckets.tz_convert('UTC').tz_localize(None)
+        for bucket, row in zip(buckets, trends.to_numpy()):
+            bucket_counts = self._bucket_counts.setdefault(bucket, dict.fromkeys(SENTIMENTS, 0))
+            for sentiment, count in zip(SENTIMENTS, row):
+                bucket_counts[sentiment] += int(count)
+
+    def expire(self, now=None):
+        """Drop posts that have aged out of the window"""
+        if self.max_age_seconds is None:
+            return 0
+        cutoff = (now if now is not None else time.time()) - self.max_age_seconds
+        expired = 0
+        while self._entries and self._entries[0][0] < cutoff:
+            self._evict_oldest()
+            expired += 1
+        return expired
+
+    def summary(self):
+        """Summary dict in the same shape as SentimentAnalyzer.analyze_posts"""
+        total_posts = self._total
+        if total_posts == 0:
+            return {
+                'total_posts': 0,
+                'sentiment_counts': {'positive': 0, 'neutral': 0, 'negative': 0},
+                'sentiment_percentages': {'positive': 0, 'neutral': 0, 'negative': 0},
+                'overall_sentiment': 'neutral',
+                'average_score': 0.0
+            }
+
+        sentiment_percentages = {
+            sentiment: (self._counts[sentiment] / total_posts) * 100 for sentiment in SENTIMENTS
+        }
+
+        # Determine overall sentiment
+        if sentiment_percentages['positive'] > sentiment_percentages['negative']:
+            overall_sentiment = 'positive'
+        elif sentiment_percentages['negative'] > sentiment_percentages['positive']:
+            overall_sentiment = 'negative'
+        else:
+            overall_sentiment = 'neutral'
+
+        return {
+            'total_posts': total_posts,
+            'sentiment_counts': {sentiment: count for sentiment, count in self._counts.items() if count},
+            'sentiment_percentages': sentiment_percentages,
+            'overall_sentiment': overall_sentiment,
+            'average_score': self._score_sum / total_posts
+        }
+
+    def trends(self):
+        """Per-bucket sentiment counts in the same shape as analyze_posts trends"""
+        buckets = sorted(self._bucket_counts)
+        index = pd.DatetimeIndex(buckets, name='bucket')
+        if self._tz is not None:
+            index = index.tz_localize('UTC').tz_convert(self._tz)
+        trends = pd.DataFrame(
+            [[self._bucket_counts[bucket][sentiment] for sentiment in SENTIMENTS] for bucket in buckets],
+            index=index,
+            columns=pd.Index(list(SENTIMENTS), name='sentiment'),
+            dtype='int64'
+        )
+        return trends
+
+    def recent_posts(self, limit=None):
+        """Scored posts in the window, oldest first"""
+        posts = [entry[4] for entry in self._entries]
+        return posts[-limit:] if limit else posts
+
+    def detailed_df(self):
+        """DataFrame of the scored posts currently in the window"""
+        return pd.DataFrame(self.recent_posts())
+
+    def __len__(self):
+        return self._total
+
+    def _add_scored(self, post, sentiment, score):
+        created_at = self._parse_timestamp(post.get('created_at'))
+        # Buckets are kept in naive UTC so aware and naive timestamps can share a window
+        if created_at.tzinfo is not None:
+            self._remember_tz(created_at.tzinfo)
+            bucket = self.trend_engine.bucket_start(created_at.astimezone(timezone.utc).replace(tzinfo=None))
+        else:
+            bucket = self.trend_engine.bucket_start(created_at)
+        scored_post = dict(post, sentiment=sentiment, score=score, created_at=created_at)
+
+        self._total += 1
+        if self.keep_posts:
+            self._entries.append((time.time(), bucket, sentiment, score, scored_post))
+        self._counts[sentiment] += 1
+        self._score_sum += score
+        bucket_counts = self._bucket_counts.setdefault(bucket, dict.fromkeys(SENTIMENTS, 0))
+        bucket_counts[sentiment] += 1
+
+        if self.window_size is not None:
+            while len(self._entries) > self.window_size:
+                self._evict_oldest()
+        self.expire()
+        return scored_post
+
+    def _evict_oldest(self):
+        _, bucket, sentiment, score, _ = self._entries.popleft()
+        self._total -= 1
+        self._counts[sentiment] -= 1
+        self._score_sum -= score
+        bucket_counts = self._bucket_counts[bucket]
+        bucket_counts[sentiment] -= 1
+        if not any(bucket_counts.values()):
+            del self._bucket_counts[bucket]
+        if not self._entries:
+            # Reset so float error cannot build up across windows
+            self._score_sum = 0.0
+
+    def _remember_tz(self, tz):
+        if self._tz is None:
+            self._tz = tz
+
+    @staticmethod
+    def _parse_timestamp(value):
+        if isinstance(value, datetime):
+            return value
+        if isinstance(value, str):
+            try:
+                return datetime.fromisoformat(value.replace('Z', '+00:00'))
+            except ValueError:
+                pass
+        return datetime.now()
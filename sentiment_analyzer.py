@@ -1,51 +1,602 @@
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-from textblob import TextBlob
+from textblob.en import sentiment as pattern_sentiment
 from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+from vaderSentiment import vaderSentiment as vader_rules
+from concurrent.futures import CancelledError, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import itertools
+import multiprocessing
+import threading
 import asyncio
+import atexit
+import json
+import os
+import math
 import re
+import string
+import time
+
+from keyword_matcher import KeywordAutomaton
+from score_cache import ScoreCache
+from sentiment_aggregator import IncrementalSentimentAggregator
+from trend_engine import TrendEngine
+
+# Persistent process pools shared by every analyzer in this process, one per
+# worker count. Scoring settings travel with each chunk, so analyzers with
+# different settings share a pool and no pool is ever replaced while in use.
+_scoring_pools = {}
+_scoring_pool_lock = threading.Lock()
+
+# Analyzers owned by a pool worker, one per scoring config
+_worker_analyzers = {}
+
+def _worker_analyzer(scoring_config):
+    key = tuple(sorted(scoring_config.items()))
+    analyzer = _worker_analyzers.get(key)
+    if analyzer is None:
+        analyzer = SentimentAnalyzer.__new__(SentimentAnalyzer)
+        analyzer._setup_scoring(**scoring_config)
+        _worker_analyzers[key] = analyzer
+    return analyzer
+
+def _init_scoring_worker(scoring_config):
+    """Load the VADER lexicon once per worker process"""
+    _worker_analyzer(scoring_config)
+
+def _score_chunk(texts, scoring_config):
+    """Score a chunk of texts inside a pool worker; returns (scores, cascade escalations)"""
+    return _worker_analyzer(scoring_config)._score_texts(texts)
+
+def get_scoring_pool(max_workers, scoring_config=None):
+    """Return the shared scoring pool for max_workers, starting it on first use
+    
+    scoring_config only warms up new workers; chunks carry their own settings.
+    """
+    with _scoring_pool_lock:
+        pool = _scoring_pools.get(max_workers)
+        if pool is None:
+            # spawn keeps workers independent of Streamlit's threads
+            pool = ProcessPoolExecutor(
+                max_workers=max_workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_scoring_worker,
+                initargs=(scoring_config or {},)
+            )
+            _scoring_pools[max_workers] = pool
+            print(f"✅ Sentiment scoring pool started with {max_workers} workers")
+        return pool
+
+def shutdown_scoring_pool(pool=None):
+    """Stop one broken scoring pool, or every running pool when pool is None"""
+    with _scoring_pool_lock:
+        if pool is None:
+            pools = list(_scoring_pools.values())
+            _scoring_pools.clear()
+        else:
+            pools = [pool]
+            for max_workers, running in list(_scoring_pools.items()):
+                if running is pool:
+                    del _scoring_pools[max_workers]
+    for running in pools:
+        running.shutdown(wait=pool is None, cancel_futures=True)
+
+atexit.register(shutdown_scoring_pool)
+
+
+# Largest difference allowed between FastVaderScorer and the reference
+# SentimentIntensityAnalyzer compound score. The fast path applies the same
+# rules in the same order, so in practice the scores are identical; the
+# tolerance is one unit of VADER's four-decimal rounding.
+FAST_VADER_TOLERANCE = 1e-4
+
+_vader_index = None
+_vader_index_lock = threading.Lock()
+
+def get_vader_index():
+    """Build the shared VADER lexicon index once per process"""
+    global _vader_index
+    with _vader_index_lock:
+        if _vader_index is None:
+            reference = SentimentIntensityAnalyzer()
+            
+            # Words that appear in multi-word special cases or boosters; an
+            # n-gram can only match when every word in it is in this set
+            idiom_words = set()
+            for phrase in list(vader_rules.SPECIAL_CASES) + list(vader_rules.BOOSTER_DICT):
+                if ' ' in phrase:
+                    idiom_words.update(phrase.split())
+            
+            _vader_index = {
+                'lexicon': reference.lexicon,
+                'emojis': reference.emojis,
+                # VADER only swaps single-character emojis
+                'emoji_chars': frozenset(e for e in reference.emojis if len(e) == 1),
+                'boosters': dict(vader_rules.BOOSTER_DICT),
+                'negations': frozenset(vader_rules.NEGATE),
+                'special_cases': dict(vader_rules.SPECIAL_CASES),
+                'idiom_words': frozenset(idiom_words)
+            }
+        return _vader_index
+
+class FastVaderScorer:
+    """VADER compound scorer working from a precomputed lexicon index"""
 
-class SentimentAnalyzer:
     def __init__(self):
-        self.vader_analyzer = SentimentIntensityAnalyzer()
+        index = get_vader_index()
+        self.lexicon = index['lexicon']
+        self.emojis = index['emojis']
+        self.emoji_chars = index['emoji_chars']
+        self.boosters = index['boosters']
+        self.negations = index['negations']
+        self.special_cases = index['special_cases']
+        self.idiom_words = index['idiom_words']
+
+    def compound(self, text):
+        """Return the VADER compound score for text"""
+        # Every emoji is non-ASCII, so plain ASCII text skips the scan entirely
+        if not text.isascii() and not self.emoji_chars.isdisjoint(text):
+            text = self._replace_emojis(text)
+        
+        punctuation = string.punctuation
+        words = []
+        for token in text.split():
+            stripped = token.strip(punctuation)
+            # Two or fewer characters left means it was probably an emoticon
+            words.append(token if len(stripped) <= 2 else stripped)
+        if not words:
+            return 0.0
+        
+        lowers = [word.lower() for word in words]
+        count = len(words)
+        allcaps = sum(1 for word in words if word.isupper())
+        is_cap_diff = 0 < count - allcaps < count
+        
+        lexicon = self.lexicon
+        boosters = self.boosters
+        sentiments = []
+        for i in range(count):
+            item_lower = lowers[i]
+            valence = lexicon.get(item_lower)
+            if (valence is None or item_lower in boosters
+                    or (item_lower == "kind" and i < count - 1 and lowers[i + 1] == "of")):
+                sentiments.append(0)
+                continue
+            
+            base_valence = valence
+            if item_lower == "no" and i != count - 1 and lowers[i + 1] in lexicon:
+                valence = 0.0
+            if ((i > 0 and lowers[i - 1] == "no") or (i > 1 and lowers[i - 2] == "no")
+                    or (i > 2 and lowers[i - 3] == "no" and lowers[i - 1] in ("or", "nor"))):
+                valence = base_valence * vader_rules.N_SCALAR
+            
+            if is_cap_diff and words[i].isupper():
+                valence += vader_rules.C_INCR if valence > 0 else -vader_rules.C_INCR
+            
+            for start_i in range(3):
+                j = i - (start_i + 1)
+                if j < 0 or lowers[j] in lexicon:
+                    continue
+                scalar = self._scalar_inc_dec(words[j], lowers[j], valence, is_cap_diff)
+                if start_i == 1 and scalar != 0:
+                    scalar = scalar * 0.95
+                if start_i == 2 and scalar != 0:
+                    scalar = scalar * 0.9
+                valence = valence + scalar
+                valence = self._negation_check(valence, lowers, start_i, i)
+                if start_i == 2:
+                    valence = self._special_idioms_check(valence, lowers, i)
+            
+            if i > 0 and lowers[i - 1] == "least" and lowers[i - 1] not in lexicon:
+                if i == 1 or lowers[i - 2] not in ("at", "very"):
+                    valence = valence * vader_rules.N_SCALAR
+            
+            sentiments.append(valence)
+        
+        if "but" in lowers:
+            self._but_check(lowers.index("but"), sentiments)
+        
+        sum_s = float(sum(sentiments))
+        if sum_s != 0:
+            ep_amplifier = min(text.count("!"), 4) * 0.292
+            qm_count = text.count("?")
+            qm_amplifier = 0
+            if qm_count > 1:
+                qm_amplifier = qm_count * 0.18 if qm_count <= 3 else 0.96
+            sum_s += (ep_amplifier + qm_amplifier) if sum_s > 0 else -(ep_amplifier + qm_amplifier)
+        
+        return round(vader_rules.normalize(sum_s), 4)
+
+    def _replace_emojis(self, text):
+        """Swap emojis for their descriptions exactly as VADER does"""
+        emojis = self.emojis
+        parts = []
+        prev_space = True
+        for char in text:
+            if char in emojis:
+                if not prev_space:
+                    parts.append(' ')
+                parts.append(emojis[char])
+                prev_space = False
+            else:
+                parts.append(char)
+                prev_space = char == ' '
+        return ''.join(parts)
+
+    def _scalar_inc_dec(self, word, word_lower, valence, is_cap_diff):
+        scalar = self.boosters.get(word_lower, 0.0)
+        if scalar:
+            if valence < 0:
+                scalar *= -1
+            if is_cap_diff and word.isupper():
+                scalar += vader_rules.C_INCR if valence > 0 else -vader_rules.C_INCR
+        return scalar
+
+    def _is_negated(self, word_lower):
+        return word_lower in self.negations or "n't" in word_lower
+
+    def _negation_check(self, valence, lowers, start_i, i):
+        if start_i == 0:
+            if self._is_negated(lowers[i - 1]):
+                valence = valence * vader_rules.N_SCALAR
+        elif start_i == 1:
+            if lowers[i - 2] == "never" and lowers[i - 1] in ("so", "this"):
+                valence = valence * 1.25
+            elif lowers[i - 2] == "without" and lowers[i - 1] == "doubt":
+                pass
+            elif self._is_negated(lowers[i - 2]):
+                valence = valence * vader_rules.N_SCALAR
+        else:
+            if (lowers[i - 3] == "never" and lowers[i - 2] in ("so", "this")) or lowers[i - 1] in ("so", "this"):
+                valence = valence * 1.25
+            elif lowers[i - 3] == "without" and (lowers[i - 2] == "doubt" or lowers[i - 1] == "doubt"):
+                pass
+            elif self._is_negated(lowers[i - 3]):
+                valence = valence * vader_rules.N_SCALAR
+        return valence
+
+    def _special_idioms_check(self, valence, lowers, i):
+        # Skip building n-grams when no nearby word can be part of one
+        idiom_words = self.idiom_words
+        if not any(word in idiom_words for word in lowers[i - 3:i + 3]):
+            return valence
+        
+        special_cases = self.special_cases
+        boosters = self.boosters
+        onezero = f"{lowers[i - 1]} {lowers[i]}"
+        twoonezero = f"{lowers[i - 2]} {lowers[i - 1]} {lowers[i]}"
+        twoone = f"{lowers[i - 2]} {lowers[i - 1]}"
+        threetwoone = f"{lowers[i - 3]} {lowers[i - 2]} {lowers[i - 1]}"
+        threetwo = f"{lowers[i - 3]} {lowers[i - 2]}"
+        
+        for seq in (onezero, twoonezero, twoone, threetwoone, threetwo):
+            if seq in special_cases:
+                valence = special_cases[seq]
+                break
+        
+        if len(lowers) - 1 > i:
+            zeroone = f"{lowers[i]} {lowers[i + 1]}"
+            if zeroone in special_cases:
+                valence = special_cases[zeroone]
+        if len(lowers) - 1 > i + 1:
+            zeroonetwo = f"{lowers[i]} {lowers[i + 1]} {lowers[i + 2]}"
+            if zeroonetwo in special_cases:
+                valence = special_cases[zeroonetwo]
+        
+        for n_gram in (threetwoone, threetwo, twoone):
+            if n_gram in boosters:
+                valence = valence + boosters[n_gram]
+        return valence
+
+    @staticmethod
+    def _but_check(but_index, sentiments):
+        # Mirrors VADER, including its lookup of each value's first occurrence
+        for sentiment in sentiments:
+            si = sentiments.index(sentiment)
+            if si < but_index:
+                sentiments.pop(si)
+                sentiments.insert(si, sentiment * 0.5)
+            elif si > but_index:
+                sentiments.pop(si)
+                sentiments.insert(si, sentiment * 1.5)
+
+class SentimentAnalyzer:
+    POSITIVE_THRESHOLD = 0.05
+    NEGATIVE_THRESHOLD = -0.05
+    
+    # vader: VADER compound only; textblob: TextBlob polarity only;
+    # combined: mean of both; cascade: TextBlob only for ambiguous VADER scores
+    SCORING_MODES = ('vader', 'textblob', 'combined', 'cascade')
+
+    def __init__(self, parallel_workers=0, parallel_min_posts=5000, parallel_chunk_size=2000,
+                 cache_entries=50000, cache_bytes=32 * 1024 * 1024, cache_path=None,
+                 vader_engine='reference', scoring_mode='combined', cascade_band=0.25,
+                 compact_output=False, arrow_text=False, trend_bucket='1h'):
+        self._setup_scoring(vader_engine, scoring_mode, cascade_band)
+        
+        # Trends are binned on absolute timestamps ('1m', '5m', '15m', '1h', '1d')
+        self.trend_engine = TrendEngine(trend_bucket)
+        
+        # Compact detailed_df output, see compact_detailed_df()
+        self.compact_output = compact_output
+        self.arrow_text = arrow_text
+        
+        # Repeated texts (retweets, templated posts, dashboard reruns) are
+        # served from the score cache; cache_entries=0 disables it
+        self.score_cache = ScoreCache(cache_entries, cache_bytes, cache_path) if cache_entries else None
+        
+        # Opt-in multi-core scoring: 0 keeps everything in this process,
+        # None uses every available core
+        self.parallel_workers = (os.cpu_count() or 1) if parallel_workers is None else parallel_workers
+        self.parallel_min_posts = parallel_min_posts
+        self.parallel_chunk_size = parallel_chunk_size
         print("✅ Basic Sentiment Analyzer initialized")
 
-    def classify_sentiment(self, text):
+    def _setup_scoring(self, vader_engine='reference', scoring_mode='combined', cascade_band=0.25):
+        """Load the scoring models"""
+        if vader_engine not in ('reference', 'fast'):
+            raise ValueError(f"Unknown VADER engine: {vader_engine}")
+        self.set_scoring_mode(scoring_mode, cascade_band)
+        
+        # Per-mode latency counters, see latency_report()
+        self._latency_stats = {}
+        self._stats_lock = threading.Lock()
+        
+        self.vader_engine = vader_engine
+        self.vader_analyzer = SentimentIntensityAnalyzer()
+        
+        # The fast engine shares one lexicon index per process
+        if vader_engine == 'fast':
+            self.fast_vader = FastVaderScorer()
+            self._vader_compound = self.fast_vader.compound
+        else:
+            self.fast_vader = None
+            self._vader_compound = self._reference_vader_compound
+
+    def set_scoring_mode(self, scoring_mode, cascade_band=None):
+        """Choose the default scorers for calls that do not pass a scoring_mode"""
+        self.scoring_mode = self._resolve_scoring_mode(scoring_mode)
+        if cascade_band is not None:
+            self.cascade_band = cascade_band
+
+    def _resolve_scoring_mode(self, scoring_mode):
+        """The per-call scoring_mode, or the analyzer default when it is None"""
+        if scoring_mode is None:
+            return self.scoring_mode
+        if scoring_mode not in self.SCORING_MODES:
+            raise ValueError(f"Unknown scoring mode: {scoring_mode}")
+        return scoring_mode
+
+    def _scoring_config(self, mode):
+        """Settings a pool worker needs to score exactly like this analyzer in mode"""
+        return {
+            'vader_engine': self.vader_engine,
+            'scoring_mode': mode,
+            'cascade_band': self.cascade_band
+        }
+
+    def latency_report(self):
+        """Per-mode scoring latency for texts that were actually scored (cache hits excluded)"""
+        report = {}
+        with self._stats_lock:
+            for mode, stats in self._latency_stats.items():
+                texts = stats['texts']
+                report[mode] = {
+                    'texts': texts,
+                    'total_ms': stats['seconds'] * 1000,
+                    'avg_ms_per_text': (stats['seconds'] * 1000 / texts) if texts else 0.0
+                }
+                if mode == 'cascade':
+                    report[mode]['textblob_rate'] = (stats['escalations'] / texts) if texts else 0.0
+        return report
+
+    def _record_latency(self, mode, texts, seconds, escalations=0):
+        with self._stats_lock:
+            stats = self._latency_stats.setdefault(mode, {'texts': 0, 'seconds': 0.0, 'escalations': 0})
+            stats['texts'] += texts
+            stats['seconds'] += seconds
+            stats['escalations'] += escalations
+
+    def _reference_vader_compound(self, text):
+        return self.vader_analyzer.polarity_scores(text)['compound']
+
+    def classify_sentiment(self, text, scoring_mode=None):
         """Classify sentiment using VADER"""
+        mode = self._resolve_scoring_mode(scoring_mode)
         try:
             if not text or not isinstance(text, str) or len(text.strip()) == 0:
                 return 'neutral', 0.0
             
-            # VADER analysis
-            vader_scores = self.vader_analyzer.polarity_scores(text)
-            compound_score = vader_scores['compound']
-            
-            # Enhanced classification with TextBlob fallback
-            try:
-                blob = TextBlob(text)
-                blob_polarity = blob.sentiment.polarity
-                # Combine VADER and TextBlob scores
-                combined_score = (compound_score + blob_polarity) / 2
-            except:
-                combined_score = compound_score
-            
-            # Determine sentiment
-            if combined_score > 0.05:
-                sentiment = 'positive'
-            elif combined_score < -0.05:
-                sentiment = 'negative'
+            if self.score_cache is None:
+                combined_score = self._score_text_timed(text, mode)
             else:
-                sentiment = 'neutral'
-            
-            return sentiment, combined_score
+                key = self._cache_key(text, mode)
+                combined_score = self.score_cache.get(key)
+                if combined_score is None:
+                    combined_score = self._score_text_timed(text, mode)
+                    self.score_cache.put(key, combined_score)
+            return self._label_score(combined_score), combined_score
             
         except Exception as e:
             print(f"❌ Error in sentiment classification: {e}")
             return 'neutral', 0.0
 
-    def analyze_posts(self, posts):
-        """Basic sentiment analysis for posts"""
+    def classify_sentiments(self, texts, scoring_mode=None):
+        """Classify a batch of texts, returning NumPy arrays of labels and scores
+        
+        scoring_mode overrides the analyzer default for this call only, so a
+        shared analyzer can serve callers that want different modes.
+        """
+        mode = self._resolve_scoring_mode(scoring_mode)
+        texts = list(texts)
+        scores = np.zeros(len(texts), dtype=np.float64)
+        
+        # Score each distinct text once and scatter the result to its rows
+        positions = {}
+        for i, text in enumerate(texts):
+            if not text or not isinstance(text, str) or len(text.strip()) == 0:
+                continue
+            positions.setdefault(text, []).append(i)
+        
+        unique_texts = list(positions)
+        if self.score_cache is None:
+            unique_scores = self._score_unique_texts(unique_texts, mode)
+        else:
+            unique_scores = self._score_unique_texts_cached(unique_texts, mode)
+        for text, score in zip(unique_texts, unique_scores):
+            scores[positions[text]] = score
+        
+        return self._label_scores(scores), scores
+
+    def component_scores(self, texts):
+        """VADER compound and TextBlob polarity per text (NaN where a scorer fails)"""
+        vader_scores = np.full(len(texts), np.nan)
+        textblob_scores = np.full(len(texts), np.nan)
+        for i, text in enumerate(texts):
+            if not text or not isinstance(text, str) or len(text.strip()) == 0:
+                continue
+            try:
+                vader_scores[i] = self._vader_compound(text)
+            except Exception as e:
+                print(f"❌ Error in VADER scoring: {e}")
+            blob_polarity = self._textblob_polarity(text)
+            if blob_polarity is not None:
+                textblob_scores[i] = blob_polarity
+        return vader_scores, textblob_scores
+
+    def _cache_key(self, text, mode):
+        namespace = f"{mode}:{self.vader_engine}"
+        if mode == 'cascade':
+            namespace += f":{self.cascade_band}"
+        return ScoreCache.make_key(text, namespace)
+
+    def _score_unique_texts_cached(self, texts, mode):
+        """Serve cached scores and score only the misses"""
+        keys = [self._cache_key(text, mode) for text in texts]
+        scores = np.zeros(len(texts), dtype=np.float64)
+        missing = []
+        for i, key in enumerate(keys):
+            cached = self.score_cache.get(key)
+            if cached is None:
+                missing.append(i)
+            else:
+                scores[i] = cached
+        
+        if missing:
+            missing_scores = self._score_unique_texts([texts[i] for i in missing], mode)
+            scores[missing] = missing_scores
+            self.score_cache.put_many([(keys[i], float(score)) for i, score in zip(missing, missing_scores)])
+        
+        return scores
+
+    def _score_unique_texts(self, texts, mode):
+        """Score texts locally or across the process pool for large batches"""
+        start = time.perf_counter()
+        scores = None
+        if self.parallel_workers > 1 and len(texts) >= self.parallel_min_posts:
+            pool = get_scoring_pool(self.parallel_workers, self._scoring_config(mode))
+            try:
+                scores, escalations = self._score_texts_parallel(pool, texts, mode)
+            except BrokenProcessPool as e:
+                print(f"❌ Scoring pool failed, scoring in-process: {e}")
+                shutdown_scoring_pool(pool)
+            except CancelledError:
+                # The pool was shut down under us (e.g. at exit); finish in-process
+                print("❌ Scoring pool shut down, scoring in-process")
+        if scores is None:
+            scores, escalations = self._score_texts(texts, mode)
+        self._record_latency(mode, len(texts), time.perf_counter() - start, escalations)
+        return scores
+
+    def _score_texts_parallel(self, pool, texts, mode):
+        """Split texts into chunks, score them in the shared process pool; returns (scores, escalations)"""
+        # Several chunks per worker keeps the cores busy when chunks vary in cost
+        chunk_size = max(1, min(self.parallel_chunk_size, math.ceil(len(texts) / (self.parallel_workers * 4))))
+        chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+        
+        # map preserves chunk order, so the merged array lines up with texts
+        results = list(pool.map(_score_chunk, chunks, itertools.repeat(self._scoring_config(mode))))
+        # Escalations counted in the workers belong in this analyzer's latency report
+        return (np.concatenate([scores for scores, _ in results]),
+                sum(escalations for _, escalations in results))
+
+    def _score_texts(self, texts, mode=None):
+        """Score non-empty texts one by one in this process; returns (scores, cascade escalations)"""
+        mode = mode or self.scoring_mode
+        scores = np.zeros(len(texts), dtype=np.float64)
+        escalations = 0
+        for i, text in enumerate(texts):
+            try:
+                scores[i], escalated = self._score_text(text, mode)
+                escalations += escalated
+            except Exception as e:
+                print(f"❌ Error in sentiment classification: {e}")
+        return scores, escalations
+
+    def _score_text_timed(self, text, mode):
+        start = time.perf_counter()
+        score, escalated = self._score_text(text, mode)
+        self._record_latency(mode, 1, time.perf_counter() - start, int(escalated))
+        return score
+
+    def _score_text(self, text, mode):
+        """Score a non-empty text with the given scorer pipeline; returns (score, escalated to TextBlob)"""
+        if mode == 'textblob':
+            blob_polarity = self._textblob_polarity(text)
+            return (0.0 if blob_polarity is None else blob_polarity), False
+        
+        # VADER analysis
+        compound_score = self._vader_compound(text)
+        if mode == 'vader':
+            return compound_score, False
+        escalated = False
+        if mode == 'cascade':
+            if not self._is_ambiguous(compound_score):
+                return compound_score, False
+            escalated = True
+        
+        # Enhanced classification with TextBlob fallback
+        blob_polarity = self._textblob_polarity(text)
+        if blob_polarity is None:
+            return compound_score, escalated
+        # Combine VADER and TextBlob scores
+        return (compound_score + blob_polarity) / 2, escalated
+
+    def _textblob_polarity(self, text):
+        """TextBlob polarity, or None if TextBlob fails on the text"""
+        # Calling the pattern analyzer directly gives the same polarity as
+        # TextBlob(text).sentiment without building a blob per text
+        try:
+            return pattern_sentiment(text)[0]
+        except Exception:
+            return None
+
+    def _is_ambiguous(self, compound_score):
+        """True when a VADER score sits within cascade_band of either threshold"""
+        return (abs(compound_score - self.POSITIVE_THRESHOLD) <= self.cascade_band
+                or abs(compound_score - self.NEGATIVE_THRESHOLD) <= self.cascade_band)
+
+    def _label_score(self, score):
+        """Map a combined score to a sentiment label"""
+        if score > self.POSITIVE_THRESHOLD:
+            return 'positive'
+        elif score < self.NEGATIVE_THRESHOLD:
+            return 'negative'
+        return 'neutral'
+
+    def _label_scores(self, scores):
+        """Vectorized _label_score over an array of scores"""
+        return np.where(
+            scores > self.POSITIVE_THRESHOLD, 'positive',
+            np.where(scores < self.NEGATIVE_THRESHOLD, 'negative', 'neutral')
+        ).astype(object)
+
+    def analyze_posts(self, posts, compact=None, scoring_mode=None, trend_bucket=None):
+        """Basic sentiment analysis for posts
+        
+        scoring_mode and trend_bucket override the analyzer defaults for this call only.
+        """
         if not posts:
             return {
                 'total_posts': 0,
@@ -55,30 +606,8 @@ class SentimentAnalyzer:
                 'average_score': 0.0
             }, pd.DataFrame(), pd.DataFrame()
         
-        # Convert to DataFrame
-        df = pd.DataFrame(posts)
-        
-        # Analyze sentiment for each post
-        sentiment_results = []
-        scores = []
-        
-        for text in df['text']:
-            sentiment, score = self.classify_sentiment(text)
-            sentiment_results.append(sentiment)
-            scores.append(score)
-        
-        df['sentiment'] = sentiment_results
-        df['score'] = scores
-        
-        # Add timestamp if not present
-        if 'created_at' not in df.columns:
-            df['created_at'] = [datetime.now() - timedelta(hours=i) for i in range(len(df))]
-        
-        # Convert created_at to datetime if it's string
-        if df['created_at'].dtype == 'object':
-            df['created_at'] = pd.to_datetime(df['created_at'], errors='coerce')
-            # Fill NaT with current time
-            df['created_at'] = df['created_at'].fillna(datetime.now())
+        df = self._score_frame(posts, scoring_mode)
+        scores = df['score'].to_numpy()
         
         # Calculate summary statistics
         sentiment_counts = df['sentiment'].value_counts().to_dict()
@@ -98,16 +627,11 @@ class SentimentAnalyzer:
         else:
             overall_sentiment = 'neutral'
         
-        average_score = np.mean(scores) if scores else 0.0
+        average_score = float(np.mean(scores)) if len(scores) else 0.0
         
-        # Generate trends by hour
-        df['hour'] = df['created_at'].dt.hour
-        trends = df.groupby(['hour', 'sentiment']).size().unstack(fill_value=0)
-        
-        # Ensure all sentiment columns exist
-        for sentiment in ['positive', 'neutral', 'negative']:
-            if sentiment not in trends.columns:
-                trends[sentiment] = 0
+        # Generate trends per time bucket
+        trend_engine = self.trend_engine if trend_bucket is None else TrendEngine(trend_bucket)
+        trends = trend_engine.build(df['created_at'], df['sentiment'])
         
         summary = {
             'total_posts': total_posts,
@@ -117,54 +641,291 @@ class SentimentAnalyzer:
             'average_score': average_score
         }
         
+        if self.compact_output if compact is None else compact:
+            df = compact_detailed_df(df, arrow_text=self.arrow_text)
+        
         return summary, trends, df
 
+    def analyze_posts_iter(self, posts, chunk_size=5000, aggregator=None, compact=None, scoring_mode=None,
+                           trend_bucket=None):
+        """Streaming analysis over any iterable of post dicts with bounded memory
+        
+        trend_bucket overrides the analyzer default like it does for analyze_posts;
+        a given aggregator already has its bucket, so it must match.
+        """
+        if aggregator is None:
+            aggregator = IncrementalSentimentAggregator(self, keep_posts=False, trend_bucket=trend_bucket)
+        elif trend_bucket is not None and aggregator.trend_engine.bucket != trend_bucket:
+            raise ValueError(f"Aggregator buckets by '{aggregator.trend_engine.bucket}', not '{trend_bucket}'")
+        return StreamingAnalysis(self, posts, chunk_size, aggregator, compact, scoring_mode)
+
+    def _score_frame(self, posts, scoring_mode=None):
+        """Build a DataFrame for posts with sentiment, score and parsed timestamps"""
+        # Convert to DataFrame
+        df = pd.DataFrame(posts)
+        
+        # Analyze sentiment for all posts in one batch
+        sentiment_results, scores = self.classify_sentiments(df['text'], scoring_mode)
+        
+        df['sentiment'] = sentiment_results
+        df['score'] = scores
+        
+        # Add timestamp if not present
+        if 'created_at' not in df.columns:
+            df['created_at'] = [datetime.now() - timedelta(hours=i) for i in range(len(df))]
+        
+        # Convert created_at to datetime if it's string
+        if not pd.api.types.is_datetime64_any_dtype(df['created_at']):
+            df['created_at'] = pd.to_datetime(df['created_at'], errors='coerce')
+            # Fill NaT with current time
+            df['created_at'] = df['created_at'].fillna(datetime.now())
+        
+        df['hour'] = df['created_at'].dt.hour
+        return df
+
+class StreamingAnalysis:
+    """Iterates scored chunks of a post stream while keeping running aggregates"""
+
+    def __init__(self, analyzer, posts, chunk_size, aggregator, compact=None, scoring_mode=None):
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be at least 1")
+        self.analyzer = analyzer
+        self.posts = posts
+        self.chunk_size = chunk_size
+        self.aggregator = aggregator
+        self.compact = compact
+        self.scoring_mode = scoring_mode
+        self.chunks_processed = 0
+
+    def __iter__(self):
+        analyzer = self.analyzer
+        compact = analyzer.compact_output if self.compact is None else self.compact
+        
+        # Only one chunk of raw posts and one scored frame are alive at a time
+        chunk = []
+        for post in self.posts:
+            if isinstance(post, dict):
+                chunk.append(post)
+            if len(chunk) >= self.chunk_size:
+                yield self._process(chunk, compact)
+                chunk = []
+        if chunk:
+            yield self._process(chunk, compact)
+
+    def summary(self):
+        """Summary over every post consumed so far"""
+        return self.aggregator.summary()
+
+    def trends(self):
+        """Trends over every post consumed so far"""
+        return self.aggregator.trends()
+
+    def _process(self, chunk, compact):
+        df = self.analyzer._score_frame(chunk, self.scoring_mode)
+        self.aggregator.add_scored_frame(df)
+        self.chunks_processed += 1
+        if compact:
+            df = compact_detailed_df(df, arrow_text=self.analyzer.arrow_text)
+        return df
+
+def iter_jsonl_posts(path):
+    """Lazily read post dicts from a JSON Lines dump"""
+    with open(path, encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                print(f"⚠️ Skipping malformed JSONL line {line_number}: {e}")
+
+def compact_detailed_df(df, arrow_text=False):
+    """Return a memory-lean copy of detailed_df with categorical, float32 and datetime64 columns"""
+    compact = df.copy()
+    
+    # Nested payloads (e.g. raw public_metrics dicts) are dropped; their useful
+    # fields are already flattened into likes/retweets
+    for column in compact.columns[compact.dtypes == object]:
+        first_value = compact[column].dropna().head(1)
+        if not first_value.empty and isinstance(first_value.iloc[0], (dict, list)):
+            compact = compact.drop(columns=column)
+    
+    if 'sentiment' in compact.columns:
+        compact['sentiment'] = pd.Categorical(compact['sentiment'], categories=['positive', 'neutral', 'negative'])
+    for column in ('language', 'language_name', 'source'):
+        if column in compact.columns:
+            compact[column] = compact[column].astype('category')
+    
+    for column in compact.columns:
+        if column == 'score' or column.endswith('_score'):
+            compact[column] = compact[column].astype(np.float32)
+    for column in ('likes', 'retweets'):
+        if column in compact.columns and pd.api.types.is_numeric_dtype(compact[column]):
+            compact[column] = pd.to_numeric(compact[column], downcast='integer')
+    if 'hour' in compact.columns:
+        compact['hour'] = compact['hour'].astype(np.int8)
+    
+    if 'created_at' in compact.columns and not pd.api.types.is_datetime64_any_dtype(compact['created_at']):
+        # Mixed naive/aware timestamps are normalised to UTC in one pass
+        compact['created_at'] = pd.to_datetime(compact['created_at'], errors='coerce', utc=True)
+    
+    if arrow_text and 'text' in compact.columns:
+        try:
+            import pyarrow  # noqa: F401
+            compact['text'] = compact['text'].astype('string[pyarrow]')
+        except ImportError:
+            print("⚠️ pyarrow not installed, keeping Python string text column")
+    
+    return compact
+
+def memory_footprint_report(standard_df, compact_df):
+    """Compare per-column and total memory of a standard and a compact detailed_df"""
+    standard = standard_df.memory_usage(deep=True, index=False)
+    compact = compact_df.memory_usage(deep=True, index=False)
+    
+    columns = {}
+    for column in standard.index.union(compact.index):
+        columns[column] = {
+            'standard_bytes': int(standard.get(column, 0)),
+            'compact_bytes': int(compact.get(column, 0)),
+            'standard_dtype': str(standard_df[column].dtype) if column in standard_df.columns else None,
+            'compact_dtype': str(compact_df[column].dtype) if column in compact_df.columns else None
+        }
+    
+    standard_total = int(standard.sum())
+    compact_total = int(compact.sum())
+    return {
+        'rows': len(standard_df),
+        'columns': columns,
+        'standard_bytes': standard_total,
+        'compact_bytes': compact_total,
+        'reduction_pct': (1 - compact_total / standard_total) * 100 if standard_total else 0.0
+    }
+
 class EnhancedSentimentAnalyzer(SentimentAnalyzer):
-    def __init__(self, gemini_analyzer=None):
-        super().__init__()
+    EMOTION_LEXICON = {
+        'joy': ['happy', 'excited', 'great', 'amazing', 'wonderful', 'love', 'excellent'],
+        'anger': ['angry', 'frustrated', 'mad', 'annoyed', 'outraged', 'hate'],
+        'sadness': ['sad', 'disappointed', 'unhappy', 'depressed', 'terrible', 'awful'],
+        'fear': ['scared', 'worried', 'anxious', 'nervous', 'concerned', 'afraid'],
+        'surprise': ['surprised', 'shocked', 'amazed', 'astonished', 'unexpected']
+    }
+
+    # Gemini review priority: local-model uncertainty first, then engagement
+    REVIEW_WEIGHTS = {'margin': 0.45, 'disagreement': 0.35, 'engagement': 0.2}
+    # Scores further than this from both thresholds count as fully certain
+    REVIEW_MARGIN = 0.3
+    # Component scores are only computed for this many candidates per review slot
+    REVIEW_SHORTLIST_FACTOR = 4
+
+    def __init__(self, gemini_analyzer=None, scoring_mode='combined', gemini_call_budget=5, **kwargs):
+        super().__init__(scoring_mode=scoring_mode, **kwargs)
         self.gemini_analyzer = gemini_analyzer
+        # Maximum posts sent to Gemini per refresh
+        self.gemini_call_budget = gemini_call_budget
+        
+        # One automaton over every emotion lexicon finds all emotions in a single pass
+        self.emotion_matcher = KeywordAutomaton(self.EMOTION_LEXICON)
         print("✅ Enhanced Sentiment Analyzer initialized")
 
-    async def analyze_posts_enhanced(self, posts_df):
+    async def analyze_posts_enhanced(self, posts_df, scoring_mode=None, trend_bucket=None):
         """Enhanced analysis with Gemini AI integration"""
         # Get basic analysis
-        basic_summary, trends, detailed_df = self.analyze_posts(posts_df.to_dict('records'))
+        basic_summary, trends, detailed_df = self.analyze_posts(
+            posts_df.to_dict('records'), scoring_mode=scoring_mode, trend_bucket=trend_bucket
+        )
+        if not detailed_df.empty:
+            detailed_df['emotions'] = self.detect_emotions_batch(detailed_df['text'])
         
         # Gemini AI analysis for selected posts
         gemini_analyses = {}
         if self.gemini_analyzer and self.gemini_analyzer.is_available:
             try:
-                # Analyze top 5 posts with highest absolute sentiment scores
-                if not detailed_df.empty:
-                    top_posts = detailed_df.nlargest(5, 'score') if len(detailed_df) >= 5 else detailed_df
-                    gemini_analyses = await self.gemini_analyzer.analyze_batch_posts(
-                        top_posts.to_dict('records'), 
-                        max_analyze=min(5, len(top_posts))
+                # Spend the call budget on the posts the local scorers are least sure about
+                selected = self.select_posts_for_review(detailed_df)
+                if selected:
+                    labels = list(selected)
+                    review_posts = detailed_df.loc[labels].to_dict('records')
+                    # Already computed for the ranking; saves the fallback scoring the text again
+                    for post, polarity in zip(review_posts, selected.values()):
+                        post['textblob_polarity'] = polarity
+                    batch_analyses = await self.gemini_analyzer.analyze_batch_posts(
+                        review_posts,
+                        max_analyze=len(review_posts)
                     )
+                    # Key results by detailed_df index label rather than position in the batch
+                    gemini_analyses = {labels[i]: analysis for i, analysis in batch_analyses.items()}
             except Exception as e:
                 print(f"❌ Gemini analysis failed: {e}")
         
         return basic_summary, trends, detailed_df, gemini_analyses
 
-    def detect_emotions(self, text):
-        """Basic emotion detection"""
-        emotions = {
-            'joy': ['happy', 'excited', 'great', 'amazing', 'wonderful', 'love', 'excellent'],
-            'anger': ['angry', 'frustrated', 'mad', 'annoyed', 'outraged', 'hate'],
-            'sadness': ['sad', 'disappointed', 'unhappy', 'depressed', 'terrible', 'awful'],
-            'fear': ['scared', 'worried', 'anxious', 'nervous', 'concerned', 'afraid'],
-            'surprise': ['surprised', 'shocked', 'amazed', 'astonished', 'unexpected']
-        }
+    def select_posts_for_review(self, detailed_df, budget=None):
+        """Index labels of the posts most worth a Gemini call, highest priority first
+        
+        Each label maps to the post's TextBlob polarity (None where TextBlob failed).
+        """
+        budget = self.gemini_call_budget if budget is None else budget
+        if detailed_df is None or detailed_df.empty or budget <= 0:
+            return {}
+        
+        texts = detailed_df['text']
+        has_text = texts.map(lambda text: isinstance(text, str) and bool(text.strip())).to_numpy(dtype=bool)
+        if not has_text.any():
+            return {}
+        candidates = detailed_df[has_text]
         
-        detected_emotions = []
-        text_lower = text.lower()
+        # Closeness of the final score to either classification threshold
+        scores = candidates['score'].to_numpy(dtype=np.float64)
+        margin = np.minimum(np.abs(scores - self.POSITIVE_THRESHOLD), np.abs(scores - self.NEGATIVE_THRESHOLD))
+        margin_uncertainty = 1.0 - np.clip(margin / self.REVIEW_MARGIN, 0.0, 1.0)
         
-        for emotion, keywords in emotions.items():
-            if any(keyword in text_lower for keyword in keywords):
-                detected_emotions.append(emotion)
+        # Log-scaled engagement so one viral post does not flatten the rest
+        engagement = np.zeros(len(candidates))
+        for column, weight in (('likes', 1.0), ('retweets', 2.0)):
+            if column in candidates.columns:
+                counts = pd.to_numeric(candidates[column], errors='coerce').to_numpy(dtype=np.float64)
+                engagement += weight * np.nan_to_num(counts)
+        engagement = np.log1p(np.clip(engagement, 0.0, None))
+        if engagement.max() > 0:
+            engagement = engagement / engagement.max()
         
+        weights = self.REVIEW_WEIGHTS
+        priority = weights['margin'] * margin_uncertainty + weights['engagement'] * engagement
+        
+        # Copies of one text would spend several calls on one answer; keep the highest-priority copy
+        ranked = np.argsort(-priority, kind='stable')
+        keys = candidates['text'].map(ScoreCache.normalize).to_numpy(dtype=object)[ranked]
+        _, first_copies = np.unique(keys, return_index=True)
+        ranked = ranked[np.sort(first_copies)]
+        
+        # Scorer disagreement needs both component scores, so only the shortlist pays for it
+        shortlist = ranked[:budget * self.REVIEW_SHORTLIST_FACTOR]
+        vader_scores, textblob_scores = self.component_scores(candidates['text'].iloc[shortlist].tolist())
+        disagreement = np.nan_to_num(np.abs(vader_scores - textblob_scores) / 2.0)
+        # Scorers pointing opposite ways are the strongest disagreement
+        disagreement[np.sign(vader_scores) * np.sign(textblob_scores) < 0] += 0.5
+        disagreement = np.clip(disagreement, 0.0, 1.0)
+        
+        shortlist_priority = priority[shortlist] + weights['disagreement'] * disagreement
+        ranking = np.argsort(-shortlist_priority, kind='stable')[:budget]
+        labels = candidates.index[shortlist[ranking]]
+        return {
+            label: None if np.isnan(polarity) else float(polarity)
+            for label, polarity in zip(labels, textblob_scores[ranking])
+        }
+
+    def detect_emotions(self, text):
+        """Basic emotion detection"""
+        detected = self.emotion_matcher.find_labels(text.lower())
+        detected_emotions = [emotion for emotion in self.EMOTION_LEXICON if emotion in detected]
         return detected_emotions if detected_emotions else ['neutral']
 
+    def detect_emotions_batch(self, texts):
+        """Emotion detection for a batch of texts"""
+        return [self.detect_emotions(text) if isinstance(text, str) else ['neutral'] for text in texts]
+
 # Test the sentiment analyzer
 def test_sentiment_analyzer():
     analyzer = SentimentAnalyzer()
@@ -189,5 +950,82 @@ def test_sentiment_analyzer():
     for i, row in df.iterrows():
         print(f"{i+1}. {row['text'][:50]}... -> {row['sentiment']} (score: {row['score']:.2f})")
 
+def _vader_parity_corpus(size=5000, seed=0):
+    """Deterministic sentences exercising VADER's negation, booster, idiom and emphasis rules"""
+    import random
+    rng = random.Random(seed)
+    vocabulary = [
+        'good', 'GOOD', 'bad', 'BAD', 'love', 'hate', 'great', 'terrible', 'amazing', 'awful', 'nice',
+        'not', "isn't", 'never', 'no', 'nor', 'or', 'without', 'doubt', 'least', 'at', 'very', 'VERY',
+        'so', 'this', 'kind', 'of', 'sort', 'really', 'barely', 'extremely', 'but', 'BUT', 'the', 'shit',
+        'bomb', 'bad ass', 'yeah', 'right', 'to', 'die', 'for', 'cut', 'mustard', 'product', 'service',
+        'update', 'is', 'was', ':)', ':(', ':D', 'lol', 'sux', '😁', '💘', '😡', '!', '!!!', '?', '??', '...'
+    ]
+    corpus = [
+        "VADER is smart, handsome, and funny.",
+        "VADER is VERY SMART, uber handsome, and FRIGGIN FUNNY!!!",
+        "VADER is not smart, handsome, nor funny.",
+        "At least it isn't a horrible book.",
+        "The book was only kind of good.",
+        "The plot was good, but the characters are uncompelling and the dialog is not great.",
+        "Today only kinda sux! But I'll get by, lol",
+        "Make sure you :) or :D today!",
+        "Catch utf-8 emoji such as 💘 and 💋 and 😁",
+        "Not bad at all",
+        "Sentiment analysis has never been this good!",
+        "With VADER, sentiment analysis is the shit!",
+        "On the other hand, VADER is quite bad ass",
+        "Without a doubt, excellent idea.",
+        "Roger Dodger is one of the least compelling variations on this theme.",
+        "Amazing developments in AI technology! The future looks bright. #Technology",
+        "Concerns about AI technology implementation. Need improvements. #Technology",
+        ""
+    ]
+    while len(corpus) < size:
+        words = [rng.choice(vocabulary) for _ in range(rng.randint(1, 18))]
+        corpus.append(' '.join(words))
+    return corpus
+
+def test_fast_vader_parity(texts=None):
+    """Check the fast VADER engine against the reference SentimentIntensityAnalyzer"""
+    texts = texts if texts is not None else _vader_parity_corpus()
+    reference = SentimentIntensityAnalyzer()
+    fast = FastVaderScorer()
+    
+    max_diff = 0.0
+    mismatches = 0
+    for text in texts:
+        diff = abs(reference.polarity_scores(text)['compound'] - fast.compound(text))
+        max_diff = max(max_diff, diff)
+        if diff > 0:
+            mismatches += 1
+    
+    print(f"Fast VADER parity: {len(texts)} texts, max |diff| {max_diff:.6f}, "
+          f"{mismatches} differing (tolerance {FAST_VADER_TOLERANCE})")
+    assert max_diff <= FAST_VADER_TOLERANCE, f"Fast VADER drifted from reference by {max_diff}"
+    return max_diff
+
+def benchmark_vader_engines(texts=None, repeat=3):
+    """Compare reference and fast VADER throughput in texts per second"""
+    texts = texts if texts is not None else _vader_parity_corpus()
+    reference = SentimentIntensityAnalyzer()
+    fast = FastVaderScorer()
+    
+    results = {}
+    for name, score in (('reference', lambda t: reference.polarity_scores(t)['compound']), ('fast', fast.compound)):
+        best = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for text in texts:
+                score(text)
+            best = min(best, time.perf_counter() - start)
+        results[name] = len(texts) / best if best > 0 else float('inf')
+    
+    print(f"VADER throughput: reference {results['reference']:,.0f} texts/s, "
+          f"fast {results['fast']:,.0f} texts/s ({results['fast'] / results['reference']:.1f}x)")
+    return results
+
 if __name__ == "__main__":
-    test_sentiment_analyzer()
\ No newline at end of file
+    test_sentiment_analyzer()
+    test_fast_vader_parity()
+    benchmark_vader_engines()
\ No newline at end of file
@@ -0,0 +1,96 @@
+import asyncio
+import concurrent.futures
+import copy
+import threading
+import time
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into one in-flight call
+
+    Futures are thread-safe, so callers on different event loops (one per
+    Streamlit session) can share a call. With a linger window, a finished
+    result keeps being served to identical calls for that many seconds.
+    """
+
+    def __init__(self, linger_seconds=0.0):
+        self.linger_seconds = linger_seconds
+        # key -> (future, finished_at or None while in flight)
+        self._calls = {}
+        self._lock = threading.Lock()
+
+        self.leaders = 0
+        self.shared = 0
+
+    async def do(self, key, call):
+        """Await call() once per key; concurrent callers with the same key await the same result"""
+        while True:
+            now = time.monotonic()
+            with self._lock:
+                self._expire(now)
+                entry = self._calls.get(key)
+                if entry is None:
+                    future = concurrent.futures.Future()
+                    self._calls[key] = (future, None)
+                    self.leaders += 1
+                    break
+                future = entry[0]
+                self.shared += 1
+
+            try:
+                # Shield so a follower giving up does not cancel the leader's call
+                result = await asyncio.shield(asyncio.wrap_future(future))
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                # The leader was cancelled, not us: try again, possibly as the new leader
+                continue
+            # Followers get their own copy so nobody mutates a shared result
+            return copy.deepcopy(result)
+
+        try:
+            result = await call()
+        except BaseException as e:
+            # Failures are never lingered; the next caller tries again
+            with self._lock:
+                self._calls.pop(key, None)
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            elif not future.done():
+                future.set_exception(e)
+            raise
+
+        with self._lock:
+            if self.linger_seconds > 0:
+                self._calls[key] = (future, time.monotonic())
+            else:
+                self._calls.pop(key, None)
+        if not future.done():
+            future.set_result(result)
+        return result
+
+    def stats(self):
+        """Calls that went out versus calls served from another caller's flight"""
+        with self._lock:
+            return {
+                'in_flight': sum(1 for _, finished_at in self._calls.values() if finished_at is None),
+                'leaders': self.leaders,
+                'shared': self.shared
+            }
+
+    def _expire(self, now):
+        expired = [key for key, (_, finished_at) in self._calls.items()
+                   if finished_at is not None and now - finished_at > self.linger_seconds]
+        for key in expired:
+            del self._calls[key]
+
+_single_flights = {}
+_single_flights_lock = threading.Lock()
+
+def get_single_flight(name, linger_seconds=0.0):
+    """Process-wide SingleFlight group; linger_seconds only applies when it is first created"""
+    with _single_flights_lock:
+        group = _single_flights.get(name)
+        if group is None:
+            group = SingleFlight(linger_seconds)
+            _single_flights[name] = group
+        return group
@@ -0,0 +1,112 @@
+import pandas as pd
+import numpy as np
+
+SENTIMENTS = ('positive', 'neutral', 'negative')
+
+# Supported bucket widths in nanoseconds
+TREND_BUCKETS = {
+    '1m': 60 * 10**9,
+    '5m': 5 * 60 * 10**9,
+    '15m': 15 * 60 * 10**9,
+    '1h': 60 * 60 * 10**9,
+    '1d': 24 * 60 * 60 * 10**9
+}
+
+class TrendEngine:
+    """Bins sentiment labels into fixed-width buckets on absolute timestamps"""
+
+    def __init__(self, bucket='1h'):
+        self.bucket = self._validate_bucket(bucket)
+
+    @property
+    def width_ns(self):
+        return TREND_BUCKETS[self.bucket]
+
+    def build(self, created_at, sentiments):
+        """Count sentiments per time bucket; returns a DataFrame indexed by bucket start"""
+        timestamps = self._to_datetime_index(created_at)
+        floored, valid_time = self._floor_ns(timestamps, self.width_ns)
+        sentiment_codes = pd.Categorical(np.asarray(sentiments), categories=SENTIMENTS).codes
+
+        # Drop rows with no timestamp or an unknown label before counting
+        mask = valid_time & (sentiment_codes >= 0)
+        floored = floored[mask]
+        sentiment_codes = sentiment_codes[mask]
+
+        buckets, bucket_codes = np.unique(floored, return_inverse=True)
+        counts = np.bincount(
+            bucket_codes * len(SENTIMENTS) + sentiment_codes,
+            minlength=len(buckets) * len(SENTIMENTS)
+        ).reshape(-1, len(SENTIMENTS))
+
+        return self._frame(counts, self._from_ns(buckets, timestamps.tz))
+
+    def bucket_start(self, timestamp):
+        """Bucket start for a single timestamp, consistent with build()"""
+        timestamp = pd.Timestamp(timestamp)
+        floored, _ = self._floor_ns(pd.DatetimeIndex([timestamp]), self.width_ns)
+        return self._from_ns(floored, timestamp.tz)[0]
+
+    def rebucket(self, trends, bucket):
+        """Re-bin pre-aggregated trends into a coarser bucket without rescoring"""
+        bucket = self._validate_bucket(bucket)
+        if trends is None or trends.empty:
+            return self._frame(np.zeros((0, len(SENTIMENTS)), dtype=np.int64), pd.DatetimeIndex([]))
+
+        # Bucket starts are already aligned, so a finer target leaves them unchanged
+        index = pd.DatetimeIndex(trends.index)
+        floored, _ = self._floor_ns(index, TREND_BUCKETS[bucket])
+        rebinned = trends.reindex(columns=list(SENTIMENTS), fill_value=0).copy()
+        rebinned.index = self._from_ns(floored, index.tz)
+        return self.merge([rebinned])
+
+    @classmethod
+    def merge(cls, trend_frames):
+        """Sum several pre-aggregated trend frames bucket by bucket"""
+        frames = [frame.reindex(columns=list(SENTIMENTS), fill_value=0)
+                  for frame in trend_frames if frame is not None and not frame.empty]
+        if not frames:
+            return cls._frame(np.zeros((0, len(SENTIMENTS)), dtype=np.int64), pd.DatetimeIndex([]))
+
+        merged = pd.concat(frames).groupby(level=0, sort=True).sum()
+        return cls._frame(merged.to_numpy(dtype=np.int64), pd.DatetimeIndex(merged.index))
+
+    @staticmethod
+    def _validate_bucket(bucket):
+        if bucket not in TREND_BUCKETS:
+            raise ValueError(f"Unknown trend bucket '{bucket}', expected one of {list(TREND_BUCKETS)}")
+        return bucket
+
+    @staticmethod
+    def _to_datetime_index(created_at):
+        if isinstance(created_at, pd.Series) and pd.api.types.is_datetime64_any_dtype(created_at):
+            return pd.DatetimeIndex(created_at)
+        try:
+            return pd.DatetimeIndex(pd.to_datetime(created_at, errors='coerce'))
+        except (ValueError, TypeError):
+            # Mixed naive and timezone-aware values
+            return pd.DatetimeIndex(pd.to_datetime(created_at, errors='coerce', utc=True))
+
+    @staticmethod
+    def _floor_ns(timestamps, width_ns):
+        """Floor to bucket boundaries on integer epoch nanoseconds (UTC for aware timestamps)"""
+        values = timestamps.as_unit('ns').asi8
+        valid = ~timestamps.isna()
+        return values - values % width_ns, np.asarray(valid)
+
+    @staticmethod
+    def _from_ns(values, tz):
+        index = pd.DatetimeIndex(np.asarray(values, dtype='datetime64[ns]'))
+        if tz is not None:
+            index = index.tz_localize('UTC').tz_convert(tz)
+        return index
+
+    @staticmethod
+    def _frame(counts, index):
+        index = index.copy()
+        index.name = 'bucket'
+        return pd.DataFrame(
+            counts,
+            index=index,
+            columns=pd.Index(list(SENTIMENTS), name='sentiment')
+        )
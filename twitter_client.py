@@ -1,35 +1,137 @@
 import os
+import math
 import aiohttp
 import asyncio
 import json
 import random
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from dotenv import load_dotenv
 import tweepy
 import re
+import threading
 import time
+from collections import deque
+
+from circuit_breaker import get_circuit_breaker
+from connectivity_cache import ConnectivityCache, get_connectivity_cache
+from single_flight import get_single_flight
+from twitter_http import TwitterHTTPClient, TwitterHTTPError, get_twitter_http_client, parse_posts
+from twitter_stream import FilteredStream
 
 load_dotenv()
 
+class PollState:
+    """since_id, recently seen ids and the adaptive interval for one polled query"""
+
+    def __init__(self, interval, max_seen_ids=5000):
+        self.since_id = None
+        self.interval = interval
+        self.next_poll_at = 0.0
+        self.last_poll_at = None
+        # Posts per second, smoothed across polls
+        self.arrival_rate = None
+        self.duplicates = 0
+
+        self._seen_ids = set()
+        self._seen_order = deque()
+        self.max_seen_ids = max_seen_ids
+
+    def filter_new(self, posts):
+        """Drop posts whose id was already delivered; posts without an id always pass"""
+        new_posts = []
+        for post in posts:
+            post_id = post.get('id')
+            if post_id is not None:
+                if post_id in self._seen_ids:
+                    self.duplicates += 1
+                    continue
+                self._remember(post_id)
+            new_posts.append(post)
+        return new_posts
+
+    def _remember(self, post_id):
+        self._seen_ids.add(post_id)
+        self._seen_order.append(post_id)
+        if len(self._seen_order) > self.max_seen_ids:
+            self._seen_ids.discard(self._seen_order.popleft())
+
+class StreamSession:
+    """Query, callbacks and polling state of one dashboard session's real-time stream"""
+
+    def __init__(self, query, poll_interval):
+        self.query = query
+        self.callbacks = []
+        self.poll_state = PollState(poll_interval)
+        self.last_check = datetime.now()
+
 class TwitterClient:
+    # Identical searches within this many seconds share one API call
+    FETCH_COALESCE_SECONDS = 5.0
+    # Consecutive API failures that open the circuit, and seconds before a probe is let through
+    CIRCUIT_FAILURE_THRESHOLD = 3
+    CIRCUIT_RECOVERY_SECONDS = 60.0
+    # Seconds a verdict on whether the credentials work is trusted, shared across processes
+    CONNECTIVITY_TTL_SECONDS = 15 * 60.0
+    
+    # Recent search returns at most 100 posts per page and covers the last 7 days
+    SEARCH_PAGE_SIZE = 100
+    SEARCH_LOOKBACK = timedelta(days=7)
+    # Fetches larger than POSTS_PER_WINDOW are split into up to HISTORICAL_WINDOWS concurrent time windows
+    POSTS_PER_WINDOW = 500
+    HISTORICAL_WINDOWS = 4
+    # Search through the pooled aiohttp client; tweepy is used when it cannot connect
+    USE_ASYNC_HTTP = True
+    # Real-time mode reads the filtered stream; polling is the fallback when it is unavailable
+    USE_FILTERED_STREAM = True
+    
+    # Polling asks only for posts newer than the last one seen, paging back at most POLL_MAX_POSTS
+    POLL_MAX_POSTS = 500
+    # The interval adapts so each poll returns about POLL_TARGET_POSTS posts, within these bounds
+    POLL_TARGET_POSTS = 20
+    POLL_INITIAL_INTERVAL = 30.0
+    POLL_MIN_INTERVAL = 5.0
+    POLL_MAX_INTERVAL = 300.0
+    # Recent search allows 450 requests per 15 minutes per app; polling may use this share of it
+    SEARCH_REQUESTS_PER_WINDOW = 450
+    SEARCH_RATE_WINDOW_SECONDS = 15 * 60.0
+    POLL_BUDGET_SHARE = 0.5
+    
     def __init__(self):
         self.bearer_token = os.getenv('TWITTER_BEARER_TOKEN')
         self.consumer_key = os.getenv('TWITTER_CONSUMER_KEY')
         self.consumer_secret = os.getenv('TWITTER_CONSUMER_SECRET')
         self.access_token = os.getenv('TWITTER_ACCESS_TOKEN')
         self.access_token_secret = os.getenv('TWITTER_ACCESS_TOKEN_SECRET')
+        # Point at a stand-in server (see twitter_stream.py --stand-in) for offline runs
+        self.api_base_url = os.getenv('TWITTER_API_BASE_URL', TwitterHTTPClient.BASE_URL)
         
         # Real-time streaming attributes (SIMPLIFIED)
         self.recent_posts = []
         self.max_recent_posts = 200
-        self.stream_callbacks = []
-        self.is_streaming = False
-        self.last_stream_check = None
+        self.filtered_stream = None
+        # The client is shared by every dashboard session; each streams under its own session id
+        self._stream_sessions = {}
+        self._stream_sessions_lock = threading.Lock()
         
-        print("🔄 Initializing Twitter Client...")
+        # tweepy client reused across searches
+        self._client = None
         
-        # Test API connectivity
-        self.api_available = self._test_api_connectivity()
+        # Shared by every client in the process, so concurrent sessions coalesce too
+        self.fetch_flight = get_single_flight('twitter:search', linger_seconds=self.FETCH_COALESCE_SECONDS)
+        # While the API is failing, searches go straight to simulated data
+        self.circuit_breaker = get_circuit_breaker(
+            'twitter:search',
+            failure_threshold=self.CIRCUIT_FAILURE_THRESHOLD,
+            recovery_timeout=self.CIRCUIT_RECOVERY_SECONDS
+        )
+        
+        # No probe here: the first real search decides whether the API is usable
+        self.connectivity = get_connectivity_cache(ttl_seconds=self.CONNECTIVITY_TTL_SECONDS)
+        self._connectivity_key = ConnectivityCache.make_key('twitter', self.bearer_token)
+        
+        print("🔄 Initializing Twitter Client...")
+        if not self.bearer_token:
+            print("⚠️ No Twitter Bearer Token found")
         
         # Enhanced sample data
         self.sample_posts = [
@@ -40,135 +142,430 @@ class TwitterClient:
             "Server downtime again! This is affecting our production environment. Need immediate fix. #TechIssues",
         ]
 
-    def _test_api_connectivity(self):
-        """Test if Twitter API credentials work"""
+    @property
+    def api_available(self):
+        """False without a token or while the API is known to reject it; unknown counts as available"""
         if not self.bearer_token:
-            print("⚠️ No Twitter Bearer Token found")
-            return False
-        
-        try:
-            # Simple test with tweepy
-            client = tweepy.Client(bearer_token=self.bearer_token)
-            # Try a simple search to test connectivity
-            response = client.search_recent_tweets(query="test", max_results=1)
-            print("✅ Twitter API connectivity confirmed")
-            return True
-        except Exception as e:
-            print(f"❌ Twitter API test failed: {e}")
             return False
+        return self.connectivity.get(self._connectivity_key) is not False
+
+    @staticmethod
+    def _is_credential_error(error):
+        """True if the API rejected the credentials rather than failing transiently"""
+        while error is not None:
+            if isinstance(error, TwitterHTTPError):
+                return error.status in (401, 403)
+            if isinstance(error, (tweepy.Unauthorized, tweepy.Forbidden)):
+                return True
+            error = error.__cause__
+        return False
 
     async def fetch_real_posts(self, query, limit=50):
         """Fetch real posts from Twitter with proper error handling"""
+        return await self.fetch_flight.do((query, limit), lambda: self._fetch_real_posts(query, limit))
+    
+    async def _fetch_real_posts(self, query, limit):
         print(f"🔍 Fetching posts for: '{query}' (limit: {limit})")
         
         if not self.api_available:
             print("⚠️ API not available, using simulated data")
             return await self.fetch_simulated_posts(query, limit)
         
+        if not self.circuit_breaker.allow_request():
+            print("⚠️ Twitter API circuit open, using simulated data")
+            return await self.fetch_simulated_posts(query, limit)
+        
         try:
-            return await self._fetch_v2_posts_safe(query, limit)
+            posts = await self._fetch_v2_posts_safe(query, limit)
+        except asyncio.CancelledError:
+            self.circuit_breaker.record_abandoned()
+            raise
         except Exception as e:
+            self._record_api_failure(e)
             print(f"❌ Twitter API error: {e}")
             return await self.fetch_simulated_posts(query, limit)
+        
+        # An empty result is a healthy response, not an outage
+        self.circuit_breaker.record_success()
+        self.connectivity.set(self._connectivity_key, True)
+        if not posts:
+            print("⚠️ No tweets found, using simulated data")
+            return await self.fetch_simulated_posts(query, limit)
+        return posts
+
+    def _record_api_failure(self, error):
+        self.circuit_breaker.record_failure()
+        if self._is_credential_error(error):
+            # Skip the API for every process until the verdict expires
+            self.connectivity.set(self._connectivity_key, False, str(error))
 
     async def _fetch_v2_posts_safe(self, query, limit):
         """Safe Twitter API v2 implementation"""
+        # Large fetches are split into concurrent time windows
+        windows = min(self.HISTORICAL_WINDOWS, math.ceil(limit / self.POSTS_PER_WINDOW))
+        
+        posts = []
         try:
-            client = tweepy.Client(bearer_token=self.bearer_token)
-            
-            clean_query = self._clean_query(query) + " -is:retweet lang:en"
-            
-            response = client.search_recent_tweets(
-                query=clean_query,
-                max_results=min(limit, 100),
-                tweet_fields=['created_at', 'public_metrics', 'author_id'],
-                user_fields=['username', 'verified'],
-                expansions=['author_id']
-            )
-            
-            if not response.data:
-                raise Exception("No tweets found")
-            
-            posts = []
-            users = {}
-            if response.includes and 'users' in response.includes:
-                users = {user.id: user for user in response.includes['users']}
-            
-            for tweet in response.data:
-                user = users.get(tweet.author_id)
-                posts.append({
-                    'text': tweet.text,
-                    'created_at': tweet.created_at.isoformat() if tweet.created_at else datetime.now().isoformat(),
-                    'likes': tweet.public_metrics.get('like_count', 0),
-                    'retweets': tweet.public_metrics.get('retweet_count', 0),
-                    'user': user.username if user else 'unknown',
-                    'verified': user.verified if user else False,
-                    'id': str(tweet.id),
-                    'source': 'twitter_v2'
-                })
-            
-            return posts
-            
+            async for page in self.iter_post_pages(query, limit, windows=windows):
+                posts.extend(page)
         except Exception as e:
-            raise Exception(f"Twitter API v2 error: {e}")
+            if not posts:
+                raise Exception(f"Twitter API v2 error: {e}") from e
+            # Keep what the earlier pages returned
+            print(f"⚠️ Pagination stopped after {len(posts)} posts: {e}")
+        
+        return posts
+
+    async def iter_post_pages(self, query, limit, start_time=None, end_time=None, windows=1):
+        """Yield pages of up to 100 posts as they arrive, deduplicated by tweet id
+        
+        Follows next_token until limit posts are found. With windows > 1 the
+        time range (default: the recent search period) is split into that many
+        sub-windows that are paged concurrently, each fetching its share of limit.
+        """
+        seen_ids = set()
+        yielded = 0
+        
+        if windows <= 1:
+            async for page in self._paginate(query, limit, start_time, end_time):
+                page = self._new_posts(page, seen_ids)[:limit - yielded]
+                if page:
+                    yielded += len(page)
+                    yield page
+            return
+        
+        # Recent search rejects an end_time closer than 10 seconds to now
+        end_time = end_time or datetime.now(timezone.utc) - timedelta(seconds=30)
+        start_time = start_time or end_time - self.SEARCH_LOOKBACK + timedelta(minutes=1)
+        width = (end_time - start_time) / windows
+        window_limit = math.ceil(limit / windows)
+        
+        pages = asyncio.Queue()
+        
+        async def fetch_window(window_start, window_end):
+            try:
+                async for page in self._paginate(query, window_limit, window_start, window_end):
+                    await pages.put(page)
+            except Exception as e:
+                await pages.put(e)
+            finally:
+                await pages.put(None)
+        
+        tasks = [
+            asyncio.ensure_future(fetch_window(start_time + width * i, start_time + width * (i + 1)))
+            for i in range(windows)
+        ]
+        errors = []
+        finished = 0
+        try:
+            while finished < windows and yielded < limit:
+                page = await pages.get()
+                if page is None:
+                    finished += 1
+                elif isinstance(page, Exception):
+                    print(f"⚠️ Window fetch failed: {page}")
+                    errors.append(page)
+                else:
+                    page = self._new_posts(page, seen_ids)[:limit - yielded]
+                    if page:
+                        yielded += len(page)
+                        yield page
+            if errors and yielded == 0:
+                raise errors[0]
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _paginate(self, query, limit, start_time=None, end_time=None, since_id=None):
+        """Follow next_token for one query and time range, prefetching the next page"""
+        clean_query = self._clean_query(query) + " -is:retweet lang:en"
+        
+        fetched = 0
+        next_page = asyncio.ensure_future(self._search_page(clean_query, limit, None, start_time, end_time, since_id))
+        try:
+            while next_page is not None:
+                posts, next_token = await next_page
+                next_page = None
+                fetched += len(posts)
+                
+                if next_token and fetched < limit:
+                    # Request the next page before this one is consumed
+                    next_page = asyncio.ensure_future(self._search_page(
+                        clean_query, limit - fetched, next_token, start_time, end_time, since_id
+                    ))
+                
+                if posts:
+                    yield posts
+        finally:
+            if next_page is not None:
+                next_page.cancel()
+
+    async def _search_page(self, clean_query, remaining, next_token, start_time, end_time, since_id=None):
+        """One recent-search request; returns (posts, next_token)"""
+        # The endpoint accepts 10-100 results per page
+        max_results = max(10, min(remaining, self.SEARCH_PAGE_SIZE))
+        
+        if self.USE_ASYNC_HTTP:
+            try:
+                payload = await get_twitter_http_client(self.bearer_token, self.api_base_url).search_recent(
+                    clean_query, max_results, next_token, start_time, end_time, since_id
+                )
+                return self._parse_search_json(payload), payload.get('meta', {}).get('next_token')
+            except TwitterHTTPError:
+                # The API answered; tweepy would get the same answer
+                raise
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                print(f"⚠️ Async Twitter client failed, retrying page with tweepy: {e}")
+        
+        response = await asyncio.to_thread(
+            self._search_client().search_recent_tweets,
+            query=clean_query,
+            max_results=max_results,
+            next_token=next_token,
+            start_time=start_time,
+            end_time=end_time,
+            since_id=since_id,
+            tweet_fields=['created_at', 'public_metrics', 'author_id'],
+            user_fields=['username', 'verified'],
+            expansions=['author_id']
+        )
+        return self._parse_search_response(response), (response.meta or {}).get('next_token')
+
+    def _search_client(self):
+        if self._client is None:
+            self._client = tweepy.Client(bearer_token=self.bearer_token)
+        return self._client
+
+    def _parse_search_response(self, response):
+        """Convert one search response page into post dicts"""
+        if not response.data:
+            return []
+        
+        posts = []
+        users = {}
+        if response.includes and 'users' in response.includes:
+            users = {user.id: user for user in response.includes['users']}
+        
+        for tweet in response.data:
+            user = users.get(tweet.author_id)
+            posts.append({
+                'text': tweet.text,
+                'created_at': tweet.created_at.isoformat() if tweet.created_at else datetime.now().isoformat(),
+                'likes': tweet.public_metrics.get('like_count', 0),
+                'retweets': tweet.public_metrics.get('retweet_count', 0),
+                'user': user.username if user else 'unknown',
+                'verified': user.verified if user else False,
+                'id': str(tweet.id),
+                'source': 'twitter_v2'
+            })
+        
+        return posts
+
+    def _parse_search_json(self, payload):
+        """Convert one raw v2 search payload into post dicts"""
+        return parse_posts(payload)
+
+    @staticmethod
+    def _new_posts(page, seen_ids):
+        """Drop posts whose id was already returned"""
+        new_posts = []
+        for post in page:
+            if post['id'] not in seen_ids:
+                seen_ids.add(post['id'])
+                new_posts.append(post)
+        return new_posts
 
     def _clean_query(self, query):
         """Clean query for Twitter API"""
         return re.sub(r'[^\w\s#@]', '', query).strip()
 
-    # SIMPLIFIED REAL-TIME STREAMING (Using polling instead of actual streaming)
-    def start_real_time_stream(self, query, callback_function):
-        """Start simulated real-time streaming using polling"""
+    # REAL-TIME STREAMING (filtered stream, polling as fallback)
+    @property
+    def is_streaming(self):
+        """Whether any session is streaming"""
+        with self._stream_sessions_lock:
+            return bool(self._stream_sessions)
+
+    def _stream_session(self, session_id):
+        with self._stream_sessions_lock:
+            return self._stream_sessions.get(session_id)
+
+    def start_real_time_stream(self, query, callback_function, session_id='default'):
+        """Start real-time streaming for one session on the filtered stream, or polling when it is unavailable
+        
+        Starting again for the same session replaces its query and callback
+        instead of adding another; other sessions are not affected.
+        """
         try:
-            self.stream_query = query
-            self.stream_callbacks.append(callback_function)
-            self.is_streaming = True
-            self.last_stream_check = datetime.now()
+            with self._stream_sessions_lock:
+                session = self._stream_sessions.get(session_id)
+                if session is None or session.query != query:
+                    session = StreamSession(query, self.POLL_INITIAL_INTERVAL)
+                    self._stream_sessions[session_id] = session
+                session.callbacks = [callback_function]
+                session.last_check = datetime.now()
             
-            print(f"✅ Real-time polling started for: '{query}'")
+            if self.USE_FILTERED_STREAM and self.api_available:
+                if self.filtered_stream is None:
+                    self.filtered_stream = FilteredStream(self.bearer_token, self.api_base_url)
+                self.filtered_stream.subscribe(session_id, self._clean_query(query) + " -is:retweet lang:en")
+                print(f"✅ Filtered stream started for: '{query}'")
+            else:
+                print(f"✅ Real-time polling started for: '{query}'")
             return True
             
         except Exception as e:
             print(f"❌ Failed to start streaming: {e}")
             return False
 
-    async def check_stream_updates(self):
-        """Check for new posts (polling-based real-time)"""
-        if not self.is_streaming:
+    def _uses_filtered_stream(self, session_id):
+        stream = self.filtered_stream
+        return stream is not None and stream.is_running and stream.is_subscribed(session_id)
+
+    async def check_stream_updates(self, session_id='default'):
+        """New posts for one session since its last check, from its stream buffer or by polling"""
+        session = self._stream_session(session_id)
+        if session is None:
+            return []
+        
+        if self._uses_filtered_stream(session_id):
+            new_posts = self.filtered_stream.drain(session_id)
+            session.last_check = datetime.now()
+            self._deliver_stream_posts(session, new_posts)
+            return new_posts
+        
+        state = session.poll_state
+        now = time.monotonic()
+        if now < state.next_poll_at:
             return []
         
         try:
-            # Fetch new posts every 30 seconds
-            if self.last_stream_check and (datetime.now() - self.last_stream_check).total_seconds() < 300:
-                return []
-            
-            new_posts = await self.fetch_real_posts(self.stream_query, 10)
-            self.last_stream_check = datetime.now()
+            if self.api_available and self.circuit_breaker.allow_request():
+                posts, requests = await self._poll_new_posts(session.query, state)
+                new_posts = state.filter_new(posts)
+                self._schedule_next_poll(state, len(new_posts), requests, time.monotonic())
+            else:
+                # Simulated posts have no ids to page from, so they come at the initial interval
+                new_posts = await self.fetch_simulated_posts(session.query, 10)
+                state.next_poll_at = time.monotonic() + state.interval
+            session.last_check = datetime.now()
             
-            # Process new posts through callbacks
             for post in new_posts:
                 post['real_time'] = True
-                for callback in self.stream_callbacks:
-                    try:
-                        callback(post)
-                    except Exception as e:
-                        print(f"❌ Callback error: {e}")
+            self._deliver_stream_posts(session, new_posts)
             
             return new_posts
             
         except Exception as e:
             print(f"❌ Stream update error: {e}")
+            state.next_poll_at = time.monotonic() + state.interval
             return []
 
-    def stop_stream(self):
-        """Stop the real-time stream"""
-        self.is_streaming = False
-        self.stream_callbacks.clear()
-        print("✅ Real-time stream stopped")
+    async def _poll_new_posts(self, query, state):
+        """Posts newer than state.since_id, oldest first, and the number of search requests used
+        
+        Pages back from the newest post until caught up with since_id. The first
+        poll for a query has no since_id, so it takes one small page as a baseline.
+        since_id only moves once every page was fetched: after a partial failure
+        the next poll pages back over the gap again, and filter_new drops the
+        posts already delivered.
+        """
+        limit = self.POLL_MAX_POSTS if state.since_id else 10
+        posts = []
+        requests = 0
+        complete = False
+        try:
+            async for page in self._paginate(query, limit, since_id=state.since_id):
+                posts.extend(page)
+                requests += 1
+        except asyncio.CancelledError:
+            self.circuit_breaker.record_abandoned()
+            raise
+        except Exception as e:
+            self._record_api_failure(e)
+            if not posts:
+                raise
+            print(f"⚠️ Polling stopped after {len(posts)} posts: {e}")
+        else:
+            self.circuit_breaker.record_success()
+            self.connectivity.set(self._connectivity_key, True)
+            complete = True
+            if state.since_id and len(posts) >= limit:
+                # Posts further back than POLL_MAX_POSTS are given up rather than chased forever
+                print(f"⚠️ Polling reached {limit} new posts; older ones since the last poll are skipped")
+        
+        # Pages arrive newest first; deliver in posting order like the stream does
+        posts.sort(key=lambda post: int(post['id']))
+        if posts and complete:
+            state.since_id = max(state.since_id or 0, int(posts[-1]['id']))
+        return posts, max(requests, 1)
+
+    def _schedule_next_poll(self, state, new_count, requests, now):
+        """Adapt the poll interval to the observed arrival rate, within the search rate budget"""
+        if state.last_poll_at is not None:
+            rate = new_count / max(now - state.last_poll_at, 1e-6)
+            state.arrival_rate = rate if state.arrival_rate is None else 0.3 * rate + 0.7 * state.arrival_rate
+        state.last_poll_at = now
+        
+        if state.arrival_rate is None:
+            interval = state.interval
+        elif state.arrival_rate > 0:
+            interval = self.POLL_TARGET_POSTS / state.arrival_rate
+        else:
+            interval = self.POLL_MAX_INTERVAL
+        
+        # Never spend more than our share of the search quota, counting every page this poll used
+        seconds_per_request = self.SEARCH_RATE_WINDOW_SECONDS / (self.SEARCH_REQUESTS_PER_WINDOW * self.POLL_BUDGET_SHARE)
+        budget_interval = requests * seconds_per_request
+        
+        state.interval = min(max(interval, budget_interval, self.POLL_MIN_INTERVAL), self.POLL_MAX_INTERVAL)
+        state.next_poll_at = now + state.interval
 
-    def add_stream_callback(self, callback_function):
-        """Add a callback function for new posts"""
-        self.stream_callbacks.append(callback_function)
+    def _deliver_stream_posts(self, session, posts):
+        """Pass new posts through the session's registered callbacks"""
+        for post in posts:
+            for callback in list(session.callbacks):
+                try:
+                    callback(post)
+                except Exception as e:
+                    print(f"❌ Callback error: {e}")
+
+    def stream_stats(self, session_id='default'):
+        """One session's filtered-stream stats, or its polling stats when it is not on the stream"""
+        session = self._stream_session(session_id)
+        if session is None:
+            return None
+        if self._uses_filtered_stream(session_id):
+            return self.filtered_stream.stats(session_id)
+        state = session.poll_state
+        return {
+            'state': f'polling every {state.interval:.0f}s',
+            'since_id': state.since_id,
+            'arrival_rate': state.arrival_rate,
+            'reconnects': 0,
+            'dropped': 0,
+            'duplicates': state.duplicates
+        }
+
+    def stop_stream(self, session_id='default'):
+        """Stop one session's real-time stream; the filtered stream stays up for the other sessions"""
+        with self._stream_sessions_lock:
+            session = self._stream_sessions.pop(session_id, None)
+        if session is None:
+            return
+        if self.filtered_stream is not None:
+            self.filtered_stream.unsubscribe(session_id)
+        print(f"✅ Real-time stream stopped for: '{session.query}'")
+
+    def add_stream_callback(self, callback_function, session_id='default'):
+        """Add a callback function for one session's new posts, once"""
+        session = self._stream_session(session_id)
+        if session is None:
+            return False
+        with self._stream_sessions_lock:
+            if callback_function not in session.callbacks:
+                session.callbacks.append(callback_function)
+        return True
 
     # SIMULATED DATA METHODS (Enhanced Fallback)
     async def fetch_simulated_posts(self, query, limit=50):
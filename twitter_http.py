@@ -0,0 +1,221 @@
+import aiohttp
+import asyncio
+import atexit
+import threading
+from datetime import datetime, timezone
+
+# Fields requested for every post, from search and from the filtered stream alike
+POST_PARAMS = {
+    'tweet.fields': 'created_at,public_metrics,author_id',
+    'user.fields': 'username,verified',
+    'expansions': 'author_id'
+}
+
+class TwitterHTTPError(Exception):
+    """Non-2xx answer from the Twitter API"""
+
+    def __init__(self, status, message, retry_after=None):
+        super().__init__(f"{status} {message}")
+        self.status = status
+        self.retry_after = retry_after
+
+class _SessionLoop:
+    """Background event loop that owns long-lived aiohttp sessions
+
+    Streamlit runs each rerun under a fresh asyncio.run() loop, and an aiohttp
+    session is bound to the loop it was created on. Keeping sessions on one
+    dedicated loop lets every caller share the same connection pool.
+    """
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name='twitter-http', daemon=True)
+        self._thread.start()
+
+    async def run(self, coro):
+        """Await a coroutine on the session loop from any other loop"""
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, self.loop))
+
+    def run_sync(self, coro, timeout=None):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout=5)
+
+_session_loop = None
+_session_loop_lock = threading.Lock()
+
+def _get_session_loop():
+    global _session_loop
+    with _session_loop_lock:
+        if _session_loop is None:
+            _session_loop = _SessionLoop()
+        return _session_loop
+
+class TwitterHTTPClient:
+    """Async Twitter API v2 client on one pooled, keep-alive aiohttp session"""
+
+    BASE_URL = 'https://api.twitter.com/2'
+
+    def __init__(self, bearer_token, base_url=BASE_URL, max_connections=100, max_connections_per_host=20,
+                 dns_cache_seconds=300, keepalive_seconds=30.0, timeout=30.0):
+        self.bearer_token = bearer_token
+        self.base_url = base_url.rstrip('/')
+        self.max_connections = max_connections
+        self.max_connections_per_host = max_connections_per_host
+        self.dns_cache_seconds = dns_cache_seconds
+        self.keepalive_seconds = keepalive_seconds
+        self.timeout = timeout
+
+        self._session_loop = _get_session_loop()
+        # Created lazily on the session loop
+        self._session = None
+
+    async def search_recent(self, query, max_results=100, next_token=None, start_time=None, end_time=None,
+                            since_id=None):
+        """GET /tweets/search/recent and return the decoded JSON payload"""
+        params = dict(POST_PARAMS, query=query, max_results=str(max_results))
+        if next_token:
+            params['next_token'] = next_token
+        if since_id:
+            params['since_id'] = str(since_id)
+        if start_time is not None:
+            params['start_time'] = self._format_time(start_time)
+        if end_time is not None:
+            params['end_time'] = self._format_time(end_time)
+        return await self._session_loop.run(self._request('GET', '/tweets/search/recent', params=params))
+
+    async def get_stream_rules(self):
+        """Current filtered-stream rules as a list of {'id', 'value', 'tag'} dicts"""
+        payload = await self._session_loop.run(self._request('GET', '/tweets/search/stream/rules'))
+        return payload.get('data', [])
+
+    async def add_stream_rules(self, rules):
+        """Add [{'value', 'tag'}] rules; returns the API response"""
+        return await self._session_loop.run(
+            self._request('POST', '/tweets/search/stream/rules', payload={'add': rules})
+        )
+
+    async def delete_stream_rules(self, rule_ids):
+        return await self._session_loop.run(
+            self._request('POST', '/tweets/search/stream/rules', payload={'delete': {'ids': list(rule_ids)}})
+        )
+
+    def submit(self, coro):
+        """Run a long-lived coroutine (e.g. a stream reader) on the session loop; returns a concurrent Future"""
+        return asyncio.run_coroutine_threadsafe(coro, self._session_loop.loop)
+
+    async def iter_stream(self, read_timeout):
+        """Yield raw byte chunks from the filtered stream until it closes
+
+        Must run on the session loop (see submit). read_timeout bounds the
+        silence between chunks, so a connection that stops sending keep-alives
+        raises asyncio.TimeoutError instead of hanging.
+        """
+        session = self._get_session()
+        timeout = aiohttp.ClientTimeout(total=None, sock_connect=self.timeout, sock_read=read_timeout)
+        async with session.get(self.base_url + '/tweets/search/stream', params=POST_PARAMS, timeout=timeout) as response:
+            await self._raise_for_status(response)
+            async for chunk in response.content.iter_any():
+                yield chunk
+
+    def close(self):
+        """Close the pooled session"""
+        if self._session is not None:
+            self._session_loop.run_sync(self._session.close(), timeout=5)
+            self._session = None
+
+    async def _request(self, method, path, params=None, payload=None):
+        # Runs on the session loop
+        session = self._get_session()
+        async with session.request(method, self.base_url + path, params=params, json=payload) as response:
+            await self._raise_for_status(response)
+            return await response.json()
+
+    @staticmethod
+    async def _raise_for_status(response):
+        if response.status >= 400:
+            try:
+                detail = (await response.json()).get('detail') or response.reason
+            except (aiohttp.ContentTypeError, ValueError):
+                detail = response.reason
+            raise TwitterHTTPError(response.status, detail, response.headers.get('x-rate-limit-reset'))
+
+    def _get_session(self):
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_connections,
+                limit_per_host=self.max_connections_per_host,
+                use_dns_cache=True,
+                ttl_dns_cache=self.dns_cache_seconds,
+                keepalive_timeout=self.keepalive_seconds
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers={
+                    'Authorization': f'Bearer {self.bearer_token}',
+                    'Accept-Encoding': 'gzip, deflate'
+                }
+            )
+        return self._session
+
+    @staticmethod
+    def _format_time(value):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc)
+        return value.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+def parse_posts(payload, source='twitter_v2'):
+    """Convert a raw v2 payload (a search page or one stream message) into post dicts"""
+    data = payload.get('data') or []
+    if isinstance(data, dict):
+        # Stream messages carry a single post
+        data = [data]
+    users = {user['id']: user for user in (payload.get('includes') or {}).get('users', [])}
+
+    posts = []
+    for tweet in data:
+        user = users.get(tweet.get('author_id'))
+        metrics = tweet.get('public_metrics') or {}
+        posts.append({
+            'text': tweet['text'],
+            'created_at': _normalize_created_at(tweet.get('created_at')),
+            'likes': metrics.get('like_count', 0),
+            'retweets': metrics.get('retweet_count', 0),
+            'user': user['username'] if user else 'unknown',
+            'verified': user.get('verified', False) if user else False,
+            'id': str(tweet['id']),
+            'source': source
+        })
+    return posts
+
+def _normalize_created_at(created_at):
+    """Raw payloads use a trailing Z; match the isoformat() strings tweepy produces"""
+    if not created_at:
+        return datetime.now().isoformat()
+    return datetime.fromisoformat(created_at.replace('Z', '+00:00')).isoformat()
+
+_http_clients = {}
+_http_clients_lock = threading.Lock()
+
+def get_twitter_http_client(bearer_token, base_url=TwitterHTTPClient.BASE_URL):
+    """Process-wide client per (token, base URL), so every caller shares one connection pool"""
+    with _http_clients_lock:
+        client = _http_clients.get((bearer_token, base_url))
+        if client is None:
+            client = TwitterHTTPClient(bearer_token, base_url)
+            _http_clients[(bearer_token, base_url)] = client
+        return client
+
+def close_twitter_http_clients():
+    with _http_clients_lock:
+        for client in _http_clients.values():
+            try:
+                client.close()
+            except Exception:
+                pass
+        _http_clients.clear()
+
+atexit.register(close_twitter_http_clients)
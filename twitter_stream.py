@@ -1,23 +1,529 @@
 import os
 import aiohttp
+import argparse
 import asyncio
+import hashlib
+import itertools
+import json
+import random
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from dotenv import load_dotenv
 
+from json_stream import NDJSONParser
+from twitter_http import TwitterHTTPClient, TwitterHTTPError, get_twitter_http_client, parse_posts
+
 load_dotenv()
-BEARER_TOKEN = os.getenv('AAAAAAAAAAAAAAAAAAAAAOhk4QEAAAAAm5Dh9yWwD1oqPuoiNR%2FcOK83egk%3DlVGJ6UHNFhkzHW4d0yw2LCnbe0SP7yqDgsWbvKcSAwz0aqWBjv')
-
-STREAM_URL = "https://api.twitter.com/2/tweets/search/stream"
-
-async def stream_tweets():
-    headers = {
-        "Authorization": f"Bearer {BEARER_TOKEN}",
-    }
-    async with aiohttp.ClientSession() as session:
-        async with session.get(STREAM_URL, headers=headers) as resp:
-            async for line in resp.content:
-                if line:
-                    tweet = line.decode('utf-8').strip()
-                    print("New Tweet:", tweet)  # Here, send to your analyzer
-
-# To run:
-# asyncio.run(stream_tweets())
\ No newline at end of file
+BEARER_TOKEN = os.getenv('TWITTER_BEARER_TOKEN')
+
+class PostBuffer:
+    """Bounded, thread-safe FIFO between the stream reader and the dashboard
+
+    When the dashboard falls behind, the oldest posts are dropped so memory
+    stays bounded and the newest posts are always the ones shown.
+    """
+
+    def __init__(self, max_posts=1000):
+        self._posts = deque(maxlen=max_posts)
+        self._lock = threading.Lock()
+
+        self.received = 0
+        self.dropped = 0
+
+    def put(self, post):
+        with self._lock:
+            if len(self._posts) == self._posts.maxlen:
+                self.dropped += 1
+            self._posts.append(post)
+            self.received += 1
+
+    def drain(self, max_posts=None):
+        """Remove and return up to max_posts buffered posts, oldest first"""
+        with self._lock:
+            count = len(self._posts) if max_posts is None else min(max_posts, len(self._posts))
+            return [self._posts.popleft() for _ in range(count)]
+
+    def __len__(self):
+        with self._lock:
+            return len(self._posts)
+
+class FilteredStream:
+    """Persistent connection to the v2 filtered stream shared by several subscribers
+
+    The API allows one stream connection per app, so every subscriber (one
+    per dashboard session) shares it: each subscriber's rule is tagged with
+    its own tag, and posts are routed by their matching rules into that
+    subscriber's own PostBuffer.
+
+    The reader runs on the shared twitter_http session loop, so it keeps going
+    across Streamlit reruns. Reconnects follow the API's guidance: linear
+    backoff after network errors and stalls, exponential backoff after HTTP
+    errors, and a longer exponential backoff after 429. A 401/403 means the
+    credentials cannot use the stream, so the reader stops for good.
+    """
+
+    # Only rules tagged with this prefix are managed here; other rules on the app are left alone
+    RULE_TAG = 'sentiment-dashboard'
+
+    NETWORK_BACKOFF_STEP = 0.25
+    NETWORK_BACKOFF_MAX = 16.0
+    HTTP_BACKOFF_START = 5.0
+    HTTP_BACKOFF_MAX = 320.0
+    RATE_LIMIT_BACKOFF_START = 60.0
+    RATE_LIMIT_BACKOFF_MAX = 900.0
+
+    def __init__(self, bearer_token, base_url=TwitterHTTPClient.BASE_URL, buffer_size=1000, keepalive_timeout=30.0):
+        self.http = get_twitter_http_client(bearer_token, base_url)
+        self.buffer_size = buffer_size
+        # The API sends a keep-alive newline every 20 seconds; longer silence means a stalled connection
+        self.keepalive_timeout = keepalive_timeout
+
+        self.state = 'stopped'
+        self.last_error = None
+        self.connects = 0
+        self.reconnects = 0
+        self.messages = 0
+        # Messages that could not be turned into posts
+        self.unhandled = 0
+
+        # subscriber id -> (rule value, rule tag, PostBuffer)
+        self._subscribers = {}
+        self._lock = threading.Lock()
+        self._sync_lock = None
+        self._parser = NDJSONParser()
+        self._future = None
+        self._received = False
+
+    @property
+    def is_running(self):
+        return self._future is not None and not self._future.done()
+
+    @classmethod
+    def rule_tag(cls, rule):
+        """Tag identifying a rule value, so posts can be routed by their matching rules"""
+        return f"{cls.RULE_TAG}:{hashlib.sha1(rule.encode('utf-8')).hexdigest()[:16]}"
+
+    def subscribe(self, subscriber_id, rule):
+        """Deliver posts matching rule into a buffer of the subscriber's own, connecting if needed"""
+        # Checked and started under one lock, so sessions starting together open a single connection
+        with self._lock:
+            previous = self._subscribers.get(subscriber_id)
+            if previous is not None and previous[0] == rule:
+                return
+            self._subscribers[subscriber_id] = (rule, self.rule_tag(rule), PostBuffer(self.buffer_size))
+            if not self.is_running:
+                self.last_error = None
+                self.state = 'connecting'
+                self._future = self.http.submit(self._run())
+            else:
+                # Rule changes apply to the open connection; no reconnect needed
+                self.http.submit(self._sync_rules_logged())
+
+    def unsubscribe(self, subscriber_id):
+        """Stop delivering to a subscriber; the connection closes with the last one"""
+        with self._lock:
+            if self._subscribers.pop(subscriber_id, None) is None:
+                return
+            # Removes the subscriber's rule, or every dashboard rule once nobody is left
+            self.http.submit(self._sync_rules_logged())
+            if not self._subscribers:
+                self._stop_reader()
+
+    def is_subscribed(self, subscriber_id):
+        with self._lock:
+            return subscriber_id in self._subscribers
+
+    def stop(self):
+        with self._lock:
+            self._stop_reader()
+
+    def _stop_reader(self):
+        # Callers hold self._lock
+        if self._future is not None:
+            self._future.cancel()
+            self._future = None
+        self.state = 'stopped'
+
+    def drain(self, subscriber_id, max_posts=None):
+        """The subscriber's posts received since its last drain, oldest first"""
+        buffer = self._buffer(subscriber_id)
+        return buffer.drain(max_posts) if buffer is not None else []
+
+    def stats(self, subscriber_id=None):
+        stats = {
+            'state': self.state,
+            'connects': self.connects,
+            'reconnects': self.reconnects,
+            'messages': self.messages,
+            'unhandled': self.unhandled,
+            'subscribers': len(self._subscribers),
+            'keepalives': self._parser.keepalives,
+            'malformed': self._parser.malformed,
+            'last_error': self.last_error
+        }
+        buffer = self._buffer(subscriber_id)
+        if buffer is not None:
+            stats.update(buffered=len(buffer), received=buffer.received, dropped=buffer.dropped)
+        return stats
+
+    def _buffer(self, subscriber_id):
+        with self._lock:
+            entry = self._subscribers.get(subscriber_id)
+        return entry[2] if entry is not None else None
+
+    async def sync_rules(self):
+        """Make the dashboard-tagged rules match the subscribers' rules, adding and deleting only the difference"""
+        if self._sync_lock is None:
+            # Created here so it belongs to the session loop
+            self._sync_lock = asyncio.Lock()
+        async with self._sync_lock:
+            with self._lock:
+                desired = {tag: rule for rule, tag, _ in self._subscribers.values()}
+            existing = [rule for rule in await self.http.get_stream_rules()
+                        if (rule.get('tag') or '').startswith(self.RULE_TAG)]
+            stale = [rule['id'] for rule in existing if desired.get(rule.get('tag')) != rule['value']]
+            present = {rule['tag'] for rule in existing if desired.get(rule.get('tag')) == rule['value']}
+            missing = [{'value': rule, 'tag': tag} for tag, rule in desired.items() if tag not in present]
+
+            if stale:
+                await self.http.delete_stream_rules(stale)
+            if missing:
+                await self.http.add_stream_rules(missing)
+
+    async def _sync_rules_logged(self):
+        try:
+            await self.sync_rules()
+        except Exception as e:
+            print(f"⚠️ Could not update filtered stream rules: {e}")
+
+    async def _run(self):
+        attempt = 0
+        rules_synced = False
+        while True:
+            self._received = False
+            try:
+                if not rules_synced:
+                    await self.sync_rules()
+                    rules_synced = True
+                self.state = 'connecting'
+                self.connects += 1
+                await self._consume()
+                error = ConnectionResetError('stream closed by the server')
+            except asyncio.CancelledError:
+                self.state = 'stopped'
+                raise
+            except (TwitterHTTPError, aiohttp.ClientError, asyncio.TimeoutError, OSError, ValueError) as e:
+                error = e
+            except Exception as e:
+                # Never let an unexpected error end the reader silently; treat it like a dropped connection
+                print(f"❌ Unexpected filtered stream error: {type(e).__name__}: {e}")
+                error = e
+
+            # A connection that delivered data resets the backoff
+            attempt = 1 if self._received else attempt + 1
+            delay = self._backoff(error, attempt)
+            self.last_error = str(error) or type(error).__name__
+            if delay is None:
+                self.state = 'failed'
+                print(f"❌ Filtered stream unavailable: {self.last_error}")
+                return
+            self.state = 'backoff'
+            self.reconnects += 1
+            print(f"⚠️ Filtered stream disconnected ({self.last_error}); reconnecting in {delay:.2f}s")
+            await asyncio.sleep(delay)
+
+    async def _consume(self):
+        self._parser.reset()
+        async for chunk in self.http.iter_stream(self.keepalive_timeout):
+            if not self._received:
+                self._received = True
+                self.state = 'connected'
+            for message in self._parser.feed(chunk):
+                try:
+                    self._handle(message)
+                except Exception as e:
+                    # One unexpected message shape must not take the connection down
+                    self.unhandled += 1
+                    self.last_error = f"unhandled message: {type(e).__name__}: {e}"
+                    print(f"⚠️ Skipped filtered stream message ({self.last_error})")
+
+    def _handle(self, message):
+        self.messages += 1
+        if 'data' in message:
+            tags = {rule.get('tag') for rule in message.get('matching_rules', [])}
+            with self._lock:
+                buffers = [buffer for _, tag, buffer in self._subscribers.values() if not tags or tag in tags]
+            if not buffers:
+                # Matched only another consumer's rules
+                return
+            for post in parse_posts(message, source='twitter_stream'):
+                post['real_time'] = True
+                for buffer in buffers:
+                    buffer.put(dict(post))
+        elif 'errors' in message:
+            error = message['errors'][0]
+            self.last_error = error.get('detail') or error.get('title') or str(error)
+            print(f"⚠️ Filtered stream error: {self.last_error}")
+
+    def _backoff(self, error, attempt):
+        """Seconds to wait before reconnect attempt number `attempt`, or None to give up"""
+        if isinstance(error, TwitterHTTPError):
+            if error.status in (401, 403):
+                return None
+            if error.status == 429:
+                delay = min(self.RATE_LIMIT_BACKOFF_START * 2 ** (attempt - 1), self.RATE_LIMIT_BACKOFF_MAX)
+                if error.retry_after:
+                    # x-rate-limit-reset is the epoch second the window reopens
+                    delay = max(delay, float(error.retry_after) - time.time())
+                return delay
+            return min(self.HTTP_BACKOFF_START * 2 ** (attempt - 1), self.HTTP_BACKOFF_MAX)
+        return min(self.NETWORK_BACKOFF_STEP * attempt, self.NETWORK_BACKOFF_MAX)
+
+class StandInStreamServer:
+    """Localhost stand-in for the filtered-stream and rules endpoints that replays canned posts
+
+    Every connection continues from where the previous one stopped. A post
+    matches a rule when it contains any of the rule's plain keywords (operators
+    such as lang:en or -is:retweet are ignored); posts matching no rule are
+    skipped. Faults for exercising reconnects:
+    connect_statuses  HTTP statuses returned to the first connection attempts
+    disconnect_after  close each connection after this many posts
+    stall_after       go silent (no keep-alives) after this many posts
+    """
+
+    SAMPLE_TEXTS = (
+        "Just tried the new release and it's fantastic! Huge improvement. #tech",
+        "Another outage today. Really frustrating experience. #fail",
+        "Reading the quarterly report on AI adoption this morning.",
+        "Love how fast the team shipped this feature, great work!",
+        "Not sure the update was worth it, the app feels slower now.",
+    )
+
+    def __init__(self, host='127.0.0.1', port=0, messages=None, post_interval=0.05, keepalive_interval=1.0,
+                 loop=True, connect_statuses=(), disconnect_after=None, stall_after=None):
+        self.messages = list(messages) if messages is not None else self.sample_messages()
+        self.post_interval = post_interval
+        self.keepalive_interval = keepalive_interval
+        self.loop = loop
+        self.connect_statuses = list(connect_statuses)
+        self.disconnect_after = disconnect_after
+        self.stall_after = stall_after
+
+        self.rules = {}
+        self.connections = 0
+        self._ids = itertools.count(1)
+        self._cursor = 0
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # Chunked responses need HTTP/1.1
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                path = self.path.split('?', 1)[0]
+                if path == '/2/tweets/search/stream/rules':
+                    with server._lock:
+                        rules = list(server.rules.values())
+                    self._send(200, {'data': rules, 'meta': {'result_count': len(rules)}})
+                elif path == '/2/tweets/search/stream':
+                    with server._lock:
+                        server.connections += 1
+                        status = server.connect_statuses.pop(0) if server.connect_statuses else 200
+                    if status != 200:
+                        self._send(status, {'title': 'Stand-in error', 'detail': f'injected {status}'})
+                        return
+                    self._stream()
+                else:
+                    self._send(404, {'detail': 'not found'})
+
+            def do_POST(self):
+                if self.path.split('?', 1)[0] != '/2/tweets/search/stream/rules':
+                    self._send(404, {'detail': 'not found'})
+                    return
+                length = int(self.headers.get('Content-Length', 0))
+                try:
+                    body = json.loads(self.rfile.read(length))
+                except ValueError:
+                    self._send(400, {'detail': 'expected JSON'})
+                    return
+                with server._lock:
+                    added = []
+                    for rule in body.get('add', []):
+                        rule_id = str(next(server._ids))
+                        server.rules[rule_id] = {'id': rule_id, 'value': rule['value'], 'tag': rule.get('tag')}
+                        added.append(server.rules[rule_id])
+                    for rule_id in body.get('delete', {}).get('ids', []):
+                        server.rules.pop(str(rule_id), None)
+                self._send(200, {'data': added, 'meta': {'summary': {'created': len(added)}}})
+
+            def _send(self, status, payload):
+                body = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _stream(self):
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Transfer-Encoding', 'chunked')
+                self.end_headers()
+                self.close_connection = True
+                sent = 0
+                last_write = time.monotonic()
+                try:
+                    while not server._stopped.is_set():
+                        if server.disconnect_after is not None and sent >= server.disconnect_after:
+                            # Drop the connection without the final chunk, like a network failure
+                            return
+                        if server.stall_after is not None and sent >= server.stall_after:
+                            server._stopped.wait(0.1)
+                            continue
+                        message = server._next_message()
+                        if message is not None:
+                            self._write_chunk(json.dumps(message).encode('utf-8') + b'\r\n')
+                            sent += 1
+                            last_write = time.monotonic()
+                        elif time.monotonic() - last_write >= server.keepalive_interval:
+                            self._write_chunk(b'\r\n')
+                            last_write = time.monotonic()
+                        server._stopped.wait(server.post_interval)
+                    self.wfile.write(b'0\r\n\r\n')
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+            def _write_chunk(self, data):
+                self.wfile.write(f"{len(data):X}\r\n".encode('ascii') + data + b"\r\n")
+                self.wfile.flush()
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @classmethod
+    def sample_messages(cls, count=200, seed=7):
+        """Stream messages in the v2 wire format built from SAMPLE_TEXTS"""
+        rng = random.Random(seed)
+        messages = []
+        for i in range(count):
+            author_id = str(1000 + rng.randint(0, 50))
+            messages.append({
+                'data': {
+                    'id': str(1800000000000000000 + i),
+                    'text': cls.SAMPLE_TEXTS[i % len(cls.SAMPLE_TEXTS)],
+                    'author_id': author_id,
+                    'public_metrics': {'like_count': rng.randint(0, 200), 'retweet_count': rng.randint(0, 40)}
+                },
+                'includes': {'users': [{'id': author_id, 'username': f'user_{author_id}', 'verified': rng.random() < 0.1}]}
+            })
+        return messages
+
+    @classmethod
+    def load_messages(cls, path):
+        """Read canned messages from an NDJSON file, one stream message per line"""
+        with open(path, 'rb') as f:
+            parser = NDJSONParser()
+            messages = parser.feed(f.read() + b'\n')
+        return messages
+
+    @property
+    def url(self):
+        """Base URL to use in place of https://api.twitter.com/2"""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/2"
+
+    def start(self):
+        """Serve in a daemon thread and return the base URL"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._server.serve_forever, name='twitter-stream-stand-in', daemon=True)
+            self._thread.start()
+        return self.url
+
+    def serve_forever(self):
+        """Serve in the calling thread until interrupted"""
+        try:
+            self._server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread = None
+        self._server.server_close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _next_message(self):
+        with self._lock:
+            if not self.rules or not self.messages:
+                # The real stream delivers nothing until rules exist
+                return None
+            if self._cursor >= len(self.messages):
+                if not self.loop:
+                    return None
+                self._cursor = 0
+            message = dict(self.messages[self._cursor])
+            self._cursor += 1
+            rules = list(self.rules.values())
+        text = message.get('data', {}).get('text', '').lower()
+        matching = [rule for rule in rules if self._matches(rule['value'], text)]
+        if not matching:
+            return None
+        message['data'] = dict(message['data'], created_at=datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.000Z'))
+        message['matching_rules'] = [{'id': rule['id'], 'tag': rule['tag']} for rule in matching]
+        return message
+
+    @staticmethod
+    def _matches(rule, text):
+        keywords = [word.lower() for word in rule.split()
+                    if not word.startswith('-') and ':' not in word and word not in ('OR', 'AND')]
+        return not keywords or any(keyword in text for keyword in keywords)
+
+async def _print_stream(stream, rules):
+    while True:
+        for rule in rules:
+            for post in stream.drain(rule):
+                print(f"New Tweet [{post['user']}] ({rule}): {post['text']}")
+        await asyncio.sleep(0.5)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Filtered-stream reader, or a local stand-in stream server')
+    parser.add_argument('--stand-in', action='store_true', help='serve canned stream data instead of reading')
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--replay', help='NDJSON file of stream messages for the stand-in to replay')
+    parser.add_argument('--post-interval', type=float, default=0.5)
+    parser.add_argument('--base-url', default=os.getenv('TWITTER_API_BASE_URL', TwitterHTTPClient.BASE_URL))
+    parser.add_argument('--rule', action='append', default=[], help='stream rule value (repeatable)')
+    args = parser.parse_args()
+
+    if args.stand_in:
+        messages = StandInStreamServer.load_messages(args.replay) if args.replay else None
+        server = StandInStreamServer(port=args.port, messages=messages, post_interval=args.post_interval)
+        print(f"Stand-in Twitter stream at {server.url} (set TWITTER_API_BASE_URL to use it)")
+        server.serve_forever()
+    else:
+        stream = FilteredStream(BEARER_TOKEN, args.base_url)
+        for rule in args.rule or ['AI -is:retweet lang:en']:
+            stream.subscribe(rule, rule)
+        try:
+            asyncio.run(_print_stream(stream, args.rule or ['AI -is:retweet lang:en']))
+        except KeyboardInterrupt:
+            stream.stop()